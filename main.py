@@ -7,9 +7,21 @@ from fastapi.middleware.cors import CORSMiddleware
 from main.api import api_router
 from fastapi.responses import RedirectResponse
 from main.utils.db import create_tables
-from main.utils.config import settings
+from main.utils.board_state import board_state
+from main.utils.leaderboard import leaderboard_index
+from main.utils.housie_tickets import ticket_engine
+from main.utils.broadcast_backend import broadcast_backend
+from main.utils.avatar_store import avatar_store, AVATAR_DIR
+from main.utils.avatar_refresh import avatar_refresh_jobs
+from main.utils.auto_draw import auto_draw
+from main.utils.outbox import outbox
+from main.utils.websocket_manager import manager
+from main.utils.static_files import ImmutableStaticFiles, PrecompressedStaticFiles, asset_manifest, ASSET_DIST_DIR
+from main.utils.number_calls import number_calls, CALLS_DIR
+from main.utils.serialization import FastJSONResponse
+from main.utils.config import settings, check_secret_key
 
-app = FastAPI(title="Fun Thursday API")
+app = FastAPI(title="Fun Thursday API", default_response_class=FastJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -20,10 +32,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create DB tables on startup
+# Create DB tables and load in-memory game state on startup
 @app.on_event("startup")
 def startup():
+    check_secret_key()
     create_tables()
+    asset_manifest.build()
+    board_state.load()
+    ticket_engine.load(board_state.drawn_numbers)
+    leaderboard_index.load()
+
+# Connect to the other workers (no-op for the default in-process backend)
+@app.on_event("startup")
+async def start_broadcast_backend():
+    await broadcast_backend.start()
+
+# Publish outbox events in the background, including any left unpublished by the last run
+@app.on_event("startup")
+async def start_outbox():
+    outbox.start()
+
+# Render any missing number-call clips without holding up startup
+@app.on_event("startup")
+async def prepare_number_calls():
+    number_calls.prepare_in_background()
+
+# Pick up avatar refresh jobs interrupted by the last shutdown
+@app.on_event("startup")
+async def resume_avatar_refresh_jobs():
+    await avatar_refresh_jobs.resume_interrupted()
+
+# Continue an automatic draw schedule from where the last run stopped
+@app.on_event("startup")
+async def resume_auto_draw():
+    await auto_draw.resume_saved(board_state.drawn_mask)
+
+@app.on_event("shutdown")
+async def stop_broadcast_backend():
+    await outbox.stop()
+    await broadcast_backend.stop()
+    await avatar_store.close()
+    await manager.stop()
+
+# Avatars are content-addressed, so they can be cached forever (mounted before /static)
+app.mount("/static/avatars", ImmutableStaticFiles(directory=AVATAR_DIR), name="avatars")
+
+# Number-call clips are content-addressed too (served precompressed where that helps)
+CALLS_DIR.mkdir(parents=True, exist_ok=True)
+app.mount("/static/tts/calls", PrecompressedStaticFiles(directory=CALLS_DIR), name="number_calls")
+
+# Fingerprinted assets (with .br/.gz variants) built by asset_manifest on startup
+app.mount("/static/dist", PrecompressedStaticFiles(directory=ASSET_DIST_DIR), name="dist")
 
 # Mount static files (JS, CSS, etc.)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -1,83 +1,205 @@
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Request
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from main.utils.db import get_db, User, HousieNumber, TreasureHunt, get_user_by_username, encrypt_answer
+from fastapi.responses import Response
+from sqlalchemy import select, update, case, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from main.utils.db import get_db, AsyncSessionLocal, User, HousieTicket, HousieClaim, OutboxEvent
+from main.utils.config import settings
+from main.utils.avatar_store import avatar_store
+from main.utils.avatar_refresh import avatar_refresh_jobs
 from main.utils.websocket_manager import manager
-from typing import List
+from main.utils.board_events import board_events
+from main.utils.board_state import board_state
+from main.utils.housie_tickets import ticket_engine, generate_ticket, encode_rows
+from main.utils.auto_draw import auto_draw
+from main.utils.leaderboard import leaderboard_index, user_record
+from main.utils.broadcast_backend import broadcast_backend
+from main.utils.broadcast_coalescer import coalescer
+from main.utils.sessions import get_session_user, user_cache
+from main.utils.treasure_clue import treasure_clue
+from main.utils.treasure_judge import treasure_judge
+from main.utils.serialization import FastJSONResponse, dumps, encoded_cache
+from main.utils.user_pages import USER_FIELDS, fetch_user_page, parse_fields
+from main.utils.outbox import outbox
+from functools import partial
+from typing import List, Optional
 import json
 from datetime import datetime
 
 router = APIRouter()
 
-# WebSocket endpoint for real-time updates
+# Single WebSocket endpoint for real-time updates. Clients pick topics with
+# ?topics=board,leaderboard (board also takes since/epoch to resume) and can
+# change them later by sending {"action": "subscribe"|"unsubscribe", "topics": [...]}
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, connection_type: str = "general"):
-    await manager.connect(websocket, connection_type)
+async def websocket_endpoint(websocket: WebSocket, topics: str = "", since: Optional[int] = None, epoch: Optional[str] = None):
+    if not await manager.connect(websocket):
+        return
     try:
+        await subscribe_topics(websocket, topics.split(","), since, epoch)
         while True:
-            # Keep connection alive
             data = await websocket.receive_text()
-            # Echo back for ping/pong
-            await websocket.send_text(data)
+            manager.touch(websocket)
+            if data == PONG:
+                continue
+            command = parse_ws_command(data)
+            if command is None:
+                # Echo back for ping/pong
+                await manager.send_personal_message(data, websocket)
+            elif command["action"] == "subscribe":
+                await subscribe_topics(websocket, command["topics"], command["since"], command["epoch"])
+            elif command["action"] == "unsubscribe":
+                manager.unsubscribe(websocket, command["topics"])
     except WebSocketDisconnect:
-        manager.disconnect(websocket, connection_type)
+        pass
+    finally:
+        # Always release the connection's slot, whatever ended the loop
+        manager.disconnect(websocket)
 
-# WebSocket endpoint for leaderboard updates
-@router.websocket("/ws/leaderboard")
-async def websocket_leaderboard(websocket: WebSocket):
-    await manager.connect(websocket, "leaderboard")
-    try:
-        while True:
-            data = await websocket.receive_text()
-            await websocket.send_text(data)
-    except WebSocketDisconnect:
-        manager.disconnect(websocket, "leaderboard")
+# Reply to the server's heartbeat ping; only refreshes the connection's last-seen time
+PONG = '{"type":"pong"}'
 
-# WebSocket endpoint for board updates
-@router.websocket("/ws/board")
-async def websocket_board(websocket: WebSocket):
-    await manager.connect(websocket, "board")
+def parse_ws_command(data: str) -> Optional[dict]:
+    """A subscribe/unsubscribe command, or None for anything else (echoed back).
+    Malformed commands come back with action "invalid" and are ignored."""
     try:
-        while True:
-            data = await websocket.receive_text()
-            await websocket.send_text(data)
-    except WebSocketDisconnect:
-        manager.disconnect(websocket, "board")
+        command = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(command, dict) or command.get("action") not in ("subscribe", "unsubscribe"):
+        return None
+
+    topics = command.get("topics", [])
+    since = command.get("since")
+    epoch = command.get("epoch")
+    if (not isinstance(topics, list) or not all(isinstance(topic, str) for topic in topics)
+            or since is not None and (not isinstance(since, int) or isinstance(since, bool))
+            or epoch is not None and not isinstance(epoch, str)):
+        return {"action": "invalid"}
+    return {"action": command["action"], "topics": topics, "since": since, "epoch": epoch}
+
+async def subscribe_topics(websocket: WebSocket, topics: List[str], since: Optional[int] = None, epoch: Optional[str] = None):
+    """Subscribe a connection to topics and send each new topic's current state"""
+    topics = [topic.strip() for topic in topics if topic.strip()]
+    if "admin" in topics:
+        async with AsyncSessionLocal() as db:
+            user = await get_session_user(websocket, db)
+        if not user or user.role != "admin":
+            # Drop every copy, so ?topics=admin,admin can't slip one through
+            topics = [topic for topic in topics if topic != "admin"]
+    
+    added = manager.subscribe(websocket, topics)
+    
+    if "leaderboard" in added:
+        # New subscribers start from a full snapshot, then receive patches
+        message = encoded_cache.message("leaderboard", leaderboard_index.etag, get_leaderboard_data, "leaderboard_update")
+        await manager.send_personal_message(message, websocket)
+    
+    if "board" in added:
+        # Replay whatever a reconnecting client missed, or a snapshot if the gap is too old
+        events = board_events.since(since, epoch) if since is not None else None
+        if events is None:
+            message = encoded_cache.message("board", board_state.etag, board_state.snapshot, "board_update")
+        else:
+            message = dumps({"type": "board_events", "data": {"events": events, "replay": True}}).decode()
+        await manager.send_personal_message(message, websocket)
+    
+    if "treasure" in added:
+        async with AsyncSessionLocal() as db:
+            payload, _etag = await treasure_clue.get(db)
+        await manager.send_personal_message(dumps({"type": "treasure_update", "data": payload}).decode(), websocket)
 
 # API endpoints for game data
+# The state endpoints carry an ETag derived from the state's version, so an
+# unchanged poll is answered with a 304 (or an empty delta with ?since=)
+# without touching the database
 @router.get("/api/leaderboard")
-async def get_leaderboard(db: Session = Depends(get_db)):
-    """Get current leaderboard (excludes admin users and soft-deleted users)"""
-    users = db.query(User).filter(User.role != "admin", User.is_deleted == 0).order_by(desc(User.points)).all()
-    leaderboard = []
-    for i, user in enumerate(users, 1):
-        leaderboard.append({
-            "rank": i,
-            "username": user.username,
-            "real_name": user.real_name,
-            "profile_photo": user.profile_photo,
-            "points": user.points
-        })
-    return {"leaderboard": leaderboard}
+async def get_leaderboard(request: Request, limit: Optional[int] = None, offset: int = 0, around: Optional[str] = None,
+                          window: int = 5, since: Optional[int] = None, epoch: Optional[str] = None):
+    """Get current leaderboard (excludes admin users and soft-deleted users)
+
+    - limit/offset: only return a slice of the ranking (e.g. top-N)
+    - around/window: return the players within `window` ranks of username `around`
+    - since/epoch: only the patches after version `since` when they are still available
+    """
+    if limit is not None and limit < 0 or offset < 0 or window < 0:
+        raise HTTPException(status_code=400, detail="limit, offset and window must not be negative")
+
+    if since is not None:
+        patches = leaderboard_index.patches_since(since, epoch)
+        if patches is not None:
+            return {
+                "version": leaderboard_index.version,
+                "epoch": leaderboard_index.epoch,
+                "patches": patches
+            }
+
+    etag = leaderboard_index.etag
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    if around is not None:
+        rank = leaderboard_index.rank_of(around)
+        if rank is None:
+            raise HTTPException(status_code=404, detail="User not on leaderboard")
+        payload = {
+            "leaderboard": leaderboard_index.around(around, window),
+            "rank": rank,
+            "version": leaderboard_index.version,
+            "epoch": leaderboard_index.epoch,
+            "total": len(leaderboard_index)
+        }
+    elif limit is None and offset == 0:
+        # The full ranking is encoded once per version and shared with WebSocket snapshots
+        return json_bytes_response(encoded_cache.body("leaderboard", etag, get_leaderboard_data), etag)
+    else:
+        payload = {
+            "leaderboard": leaderboard_index.top(limit, offset),
+            "version": leaderboard_index.version,
+            "epoch": leaderboard_index.epoch,
+            "total": len(leaderboard_index)
+        }
+    return FastJSONResponse(payload, headers=cache_headers(etag))
 
 @router.get("/api/board")
-async def get_board(db: Session = Depends(get_db)):
-    """Get current game board state"""
-    # Get all drawn numbers
-    drawn_numbers = db.query(HousieNumber).order_by(HousieNumber.id).all()
-    numbers = [num.number_drawn for num in drawn_numbers]
-    
-    # Get current number (last drawn)
-    current_number = numbers[-1] if numbers else None
-    
-    return {
-        "current_number": current_number,
-        "drawn_numbers": numbers,
-        "total_drawn": len(numbers)
-    }
+async def get_board(request: Request, since: Optional[int] = None, epoch: Optional[str] = None):
+    """Get current game board state, or only the events after `since` when they are still available"""
+    if since is not None:
+        events = board_events.since(since, epoch)
+        if events is not None:
+            return {
+                "seq": board_events.seq,
+                "epoch": board_events.epoch,
+                "events": events
+            }
+
+    etag = board_state.etag
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_bytes_response(encoded_cache.body("board", etag, board_state.snapshot), etag)
+
+def cache_headers(etag: str) -> dict:
+    """Let clients keep the response but revalidate it on every use"""
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak validators compare equal to strong ones for GET
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
+
+def json_bytes_response(body: bytes, etag: Optional[str] = None) -> Response:
+    """Send already encoded JSON as is"""
+    return Response(body, media_type="application/json", headers=cache_headers(etag) if etag else None)
 
 @router.post("/api/draw-number")
-async def draw_number(request: dict, db: Session = Depends(get_db)):
+async def draw_number(request: dict, db: AsyncSession = Depends(get_db)):
     """Draw a new number (admin only)"""
     number = request.get("number")
     if not number:
@@ -86,58 +208,80 @@ async def draw_number(request: dict, db: Session = Depends(get_db)):
     if number < 1 or number > 90:
         raise HTTPException(status_code=400, detail="Number must be between 1 and 90")
     
-    # Check if number already drawn
-    existing = db.query(HousieNumber).filter(HousieNumber.number_drawn == number).first()
-    if existing:
+    event = await draw_and_publish(db, number)
+    if event is None:
         raise HTTPException(status_code=400, detail="Number already drawn")
     
-    # Add new number
-    new_number = HousieNumber(number_drawn=number)
-    db.add(new_number)
-    db.commit()
-    db.refresh(new_number)
+    return {"message": f"Number {number} drawn successfully", "number": number}
+
+@router.get("/api/auto-draw")
+async def get_auto_draw():
+    """Get the automatic draw schedule status"""
+    return auto_draw.status_record()
+
+@router.post("/api/auto-draw/start")
+async def start_auto_draw(request: dict):
+    """Shuffle the numbers left and draw one every `interval` seconds (admin only)"""
+    interval = request.get("interval", settings.AUTO_DRAW_INTERVAL)
+    if not isinstance(interval, (int, float)) or interval < 1:
+        raise HTTPException(status_code=400, detail="Interval must be at least 1 second")
     
-    # Broadcast to all board connections
-    await manager.broadcast_board({
-        "current_number": number,
-        "drawn_numbers": [n.number_drawn for n in db.query(HousieNumber).order_by(HousieNumber.id).all()]
-    })
+    return await auto_draw.start(float(interval), board_state.drawn_mask)
+
+@router.post("/api/auto-draw/{action}")
+async def control_auto_draw(action: str):
+    """Pause, resume, skip (draw now) or stop the automatic draw schedule (admin only)"""
+    controls = {
+        "pause": auto_draw.pause,
+        "resume": auto_draw.resume,
+        "skip": auto_draw.skip,
+        "stop": auto_draw.stop
+    }
+    if action not in controls:
+        raise HTTPException(status_code=404, detail="Unknown auto-draw action")
     
-    return {"message": f"Number {number} drawn successfully", "number": number}
+    return await controls[action]()
 
+# User listings are paged by username: pass the returned next_cursor back as
+# ?cursor= for the following page. q searches username/real name prefixes and
+# fields picks the columns (user_id is always included)
 @router.get("/api/users")
-async def get_users(db: Session = Depends(get_db)):
-    """Get all users (including admins and soft-deleted users for admin panel)"""
-    users = db.query(User).order_by(User.username).all()
-    return {"users": [
-        {
-            "user_id": user.user_id,
-            "username": user.username,
-            "real_name": user.real_name,
-            "profile_photo": user.profile_photo,
-            "points": user.points,
-            "role": user.role,
-            "is_deleted": user.is_deleted
-        } for user in users
-    ]}
+async def get_users(cursor: Optional[str] = None, limit: Optional[int] = None, q: Optional[str] = None,
+                    fields: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    """Get a page of users (including admins and soft-deleted users for admin panel)"""
+    return await user_page(db, cursor, limit, q, fields, USER_FIELDS)
 
 @router.get("/api/users/non-admin")
-async def get_non_admin_users(db: Session = Depends(get_db)):
-    """Get only non-admin users for points allocation (excludes soft-deleted users)"""
-    users = db.query(User).filter(User.role != "admin", User.is_deleted == 0).order_by(User.username).all()
-    return {"users": [
-        {
-            "user_id": user.user_id,
-            "username": user.username,
-            "real_name": user.real_name,
-            "profile_photo": user.profile_photo,
-            "points": user.points,
-            "role": user.role
-        } for user in users
-    ]}
+async def get_non_admin_users(cursor: Optional[str] = None, limit: Optional[int] = None, q: Optional[str] = None,
+                              fields: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    """Get a page of non-admin users for points allocation (excludes soft-deleted users)"""
+    default_fields = ("user_id", "username", "real_name", "profile_photo", "points", "role")
+    if cursor or q or limit is not None:
+        return await user_page(db, cursor, limit, q, fields, default_fields, players_only=True)
+
+    # A plain first page lists the leaderboard's players, so it is encoded once per
+    # leaderboard revision (and projection); every user change applied here bumps it
+    try:
+        columns = ",".join(parse_fields(fields, default_fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    async def load():
+        return await user_page(db, None, None, None, columns, default_fields, players_only=True)
+    return json_bytes_response(await encoded_cache.body_async(f"non_admin_users:{columns}", leaderboard_index.revision, load))
+
+async def user_page(db: AsyncSession, cursor: Optional[str], limit: Optional[int], q: Optional[str],
+                    fields: Optional[str], default_fields, players_only: bool = False) -> dict:
+    """Helper function to validate listing parameters and fetch one page"""
+    limit = settings.USERS_PAGE_SIZE if limit is None else limit
+    if not 1 <= limit <= settings.USERS_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {settings.USERS_PAGE_MAX}")
+    try:
+        return await fetch_user_page(db, parse_fields(fields, default_fields), limit, cursor, q and q.strip(), players_only)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/api/update-points")
-async def update_points(request: dict, db: Session = Depends(get_db)):
+async def update_points(request: dict, db: AsyncSession = Depends(get_db)):
     """Update user points (admin only)"""
     user_id = request.get("user_id")
     points = request.get("points")
@@ -145,7 +289,7 @@ async def update_points(request: dict, db: Session = Depends(get_db)):
     if not user_id or not points:
         raise HTTPException(status_code=400, detail="user_id and points are required")
     
-    user = db.query(User).filter(User.user_id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -153,112 +297,353 @@ async def update_points(request: dict, db: Session = Depends(get_db)):
     if user.role == "admin":
         raise HTTPException(status_code=400, detail="Cannot give points to admin users")
     
-    user.points += points
-    db.commit()
+    # Add in the database, so concurrent awards can't overwrite each other
+    await db.execute(
+        update(User)
+        .where(User.user_id == user_id)
+        .values(points=User.points + points)
+        .execution_options(synchronize_session=False)
+    )
+
+    # Reload the new total for the broadcast and the response (the announcement commits with it)
+    user = (await db.execute(
+        select(User).where(User.user_id == user_id).execution_options(populate_existing=True)
+    )).scalars().one()
+    announcement = stage_user_changes(db, user)
+    await db.commit()
     
     # Broadcast leaderboard update
-    await manager.broadcast_leaderboard(await get_leaderboard_data(db))
+    apply_user_changes(announcement, user)
     
     return {"message": f"Added {points} points to {user.real_name}", "user": user.real_name, "new_points": user.points}
 
+@router.post("/api/update-points/bulk")
+async def update_points_bulk(request: dict, db: AsyncSession = Depends(get_db)):
+    """Award points to several users at once (admin only)
+
+    Body: {"entries": [{"user_id": 1, "points": 10}, ...]}. Every entry is validated
+    before anything is written; the update runs as one statement in one transaction
+    and produces a single leaderboard broadcast.
+    """
+    entries = request.get("entries")
+    if not entries or not isinstance(entries, list):
+        raise HTTPException(status_code=400, detail="entries must be a non-empty list")
+
+    # Merge repeated users so each gets a single delta
+    deltas = {}
+    for entry in entries:
+        user_id = entry.get("user_id") if isinstance(entry, dict) else None
+        points = entry.get("points") if isinstance(entry, dict) else None
+        if not isinstance(user_id, int) or not isinstance(points, int) or not user_id or not points:
+            raise HTTPException(status_code=400, detail="Each entry needs an integer user_id and non-zero points")
+        deltas[user_id] = deltas.get(user_id, 0) + points
+
+    users = (await db.execute(select(User).where(User.user_id.in_(deltas)))).scalars().all()
+    found = {user.user_id: user for user in users}
+    missing = [user_id for user_id in deltas if user_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Users not found: {missing}")
+
+    # Prevent giving points to admin users
+    admins = [user.real_name for user in users if user.role == "admin"]
+    if admins:
+        raise HTTPException(status_code=400, detail=f"Cannot give points to admin users: {', '.join(admins)}")
+
+    await db.execute(
+        update(User)
+        .where(User.user_id.in_(deltas))
+        .values(points=User.points + case(deltas, value=User.user_id, else_=0))
+        .execution_options(synchronize_session=False)
+    )
+
+    # Reload the new totals for the broadcast and the response (the announcement commits with them)
+    users = (await db.execute(
+        select(User).where(User.user_id.in_(deltas)).execution_options(populate_existing=True)
+    )).scalars().all()
+    announcement = stage_user_changes(db, *users)
+    await db.commit()
+
+    # Broadcast leaderboard update
+    apply_user_changes(announcement, *users)
+
+    return {
+        "message": f"Awarded points to {len(users)} players",
+        "results": [
+            {"user_id": user.user_id, "user": user.real_name, "points": deltas[user.user_id], "new_points": user.points}
+            for user in users
+        ]
+    }
+
 @router.delete("/api/delete-user/{user_id}")
-async def delete_user(user_id: int, db: Session = Depends(get_db)):
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """Soft delete user (admin only)"""
-    user = db.query(User).filter(User.user_id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Soft delete - mark as deleted instead of removing
     user.is_deleted = 1
-    db.commit()
+    announcement = stage_user_changes(db, user)
+    await db.commit()
     
     # Broadcast leaderboard update
-    await manager.broadcast_leaderboard(await get_leaderboard_data(db))
+    apply_user_changes(announcement, user)
     
     return {"message": f"User {user.real_name} deleted successfully"}
 
 @router.post("/api/restore-user/{user_id}")
-async def restore_user(user_id: int, db: Session = Depends(get_db)):
+async def restore_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """Restore soft-deleted user (admin only)"""
-    user = db.query(User).filter(User.user_id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Restore user - mark as active
     user.is_deleted = 0
-    db.commit()
+    announcement = stage_user_changes(db, user)
+    await db.commit()
     
     # Broadcast leaderboard update
-    await manager.broadcast_leaderboard(await get_leaderboard_data(db))
+    apply_user_changes(announcement, user)
     
     return {"message": f"User {user.real_name} restored successfully"}
 
 @router.delete("/api/clear-numbers")
-async def clear_numbers(db: Session = Depends(get_db)):
+async def clear_numbers(db: AsyncSession = Depends(get_db)):
     """Clear all drawn numbers (admin only)"""
-    db.query(HousieNumber).delete()
-    db.commit()
+    # End any automatic schedule first, so no scheduled draw lands in the new game
+    await auto_draw.stop()
+    
+    event, announcement = await board_state.clear(db)
     
     # Broadcast board update
-    await manager.broadcast_board({
-        "current_number": None,
-        "drawn_numbers": []
-    })
+    dispatch_board_event(announcement, event)
     
     return {"message": "All numbers cleared successfully"}
 
+@router.post("/api/housie/tickets")
+async def deal_tickets(request: dict, db: AsyncSession = Depends(get_db)):
+    """Deal Housie tickets to every active player without one; regenerate replaces all tickets (admin only)"""
+    regenerate = bool(request.get("regenerate"))
+    
+    # Hold draws off while the set of tickets changes
+    async with board_state.lock:
+        if regenerate:
+            await db.execute(delete(HousieTicket))
+            await db.execute(delete(HousieClaim))
+        
+        players = (await db.execute(
+            select(User).where(User.role != "admin", User.is_deleted == 0)
+        )).scalars().all()
+        dealt = []
+        for user in players:
+            if not regenerate and ticket_engine.tickets_for(user.user_id):
+                continue
+            for _ in range(settings.HOUSIE_TICKETS_PER_USER):
+                ticket = HousieTicket(user_id=user.user_id, rows=encode_rows(generate_ticket()))
+                db.add(ticket)
+                dealt.append((ticket, user.real_name))
+        await db.commit()
+        
+        if regenerate:
+            ticket_engine.reset()
+        for ticket, owner in dealt:
+            ticket_engine.add(ticket, owner, board_state.drawn_mask)
+    
+    await broadcast_backend.publish("housie", {})
+    
+    return {
+        "message": f"Dealt {len(dealt)} tickets",
+        "dealt": len(dealt),
+        "total": len(ticket_engine.tickets)
+    }
+
+@router.get("/api/housie/my-tickets")
+async def get_my_tickets(request: Request, db: AsyncSession = Depends(get_db)):
+    """Get the current user's Housie tickets and the prizes claimed so far"""
+    session_user = await get_session_user(request, db)
+    if not session_user:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    
+    return {
+        "tickets": [
+            {"ticket_id": ticket.ticket_id, "grid": ticket.grid()}
+            for ticket in ticket_engine.tickets_for(session_user.user_id)
+        ],
+        "claims": ticket_engine.claims
+    }
+
+@router.get("/api/housie/claims")
+async def get_claims():
+    """Get the prizes claimed in the current game"""
+    return {"claims": ticket_engine.claims}
+
 @router.post("/api/refresh-avatars")
-async def refresh_avatars(db: Session = Depends(get_db)):
-    """Refresh all user avatars based on their gender"""
+async def refresh_avatars():
+    """Start refreshing all user avatars in the background; progress is pushed over WebSocket"""
     try:
-        from main.utils.db import update_existing_user_avatars
-        update_existing_user_avatars()
-        return {"message": "Avatars refreshed successfully"}
+        job = await avatar_refresh_jobs.start()
+        return {"message": "Avatar refresh started", "job": job}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error refreshing avatars: {str(e)}")
 
-async def get_leaderboard_data(db: Session):
+@router.get("/api/refresh-avatars/{job_id}")
+async def get_avatar_refresh_job(job_id: str):
+    """Get the progress of an avatar refresh job"""
+    job = await avatar_refresh_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job": job}
+
+def get_leaderboard_data():
     """Helper function to get leaderboard data (excludes admin users and soft-deleted users)"""
-    users = db.query(User).filter(User.role != "admin", User.is_deleted == 0).order_by(desc(User.points)).all()
-    leaderboard = []
-    for i, user in enumerate(users, 1):
-        leaderboard.append({
-            "rank": i,
-            "username": user.username,
-            "real_name": user.real_name,
-            "profile_photo": user.profile_photo,
-            "points": user.points
-        })
-    return {"leaderboard": leaderboard}
+    return leaderboard_index.snapshot()
+
+async def broadcast_leaderboard_changes():
+    """Helper function to schedule a leaderboard patch; changes within the coalescing window share one"""
+    await coalescer.submit("leaderboard", flush_leaderboard_changes)
+
+async def flush_leaderboard_changes(_items: List):
+    """Broadcast only the leaderboard rows that changed since the last push"""
+    patch = leaderboard_index.take_patch()
+    if patch:
+        await manager.broadcast_leaderboard_patch(patch)
+
+async def flush_board_events(events: List[dict]):
+    """Broadcast every board event collected during the coalescing window in one message"""
+    await manager.broadcast_board_events(events)
+
+# Mutations record their broadcast in the outbox in the same transaction
+# (stage_*); once committed they apply the change to memory and push it to
+# local clients, leaving the other workers to the outbox publisher (apply_*/dispatch_*)
+def stage_user_changes(db: AsyncSession, *users: User) -> OutboxEvent:
+    """Helper function to record user changes for the other workers, in the caller's transaction"""
+    return outbox.add(db, "leaderboard", {"users": [user_record(user) for user in users]})
+
+def apply_user_changes(announcement: OutboxEvent, *users: User):
+    """Helper function to apply committed user changes to the leaderboard and queue their broadcast"""
+    for user in users:
+        user_cache.invalidate(user.user_id)
+        leaderboard_index.upsert(user)
+    outbox.dispatch(announcement, broadcast_leaderboard_changes)
+
+async def publish_user_changes(*users: User):
+    """Helper function to announce user changes that were committed without an outbox event"""
+    async with AsyncSessionLocal() as db:
+        announcement = stage_user_changes(db, *users)
+        await db.commit()
+    apply_user_changes(announcement, *users)
+
+def stage_treasure_win(db: AsyncSession, winner: User) -> List[OutboxEvent]:
+    """Helper function to record a solved clue's broadcasts in the winning transaction"""
+    return [stage_user_changes(db, winner), outbox.add(db, "treasure", {})]
+
+async def draw_and_publish(db: AsyncSession, number: int) -> Optional[dict]:
+    """Helper function to draw a number and broadcast it; None if already drawn"""
+    # Duplicate check and insert happen atomically against the in-memory board;
+    # the claims the number completes are saved in the same transaction
+    drawn = await board_state.draw(db, number)
+    if drawn is None:
+        return None
+    event, announcement = drawn
+    
+    # Broadcast only the new number to all board connections
+    dispatch_board_event(announcement, event)
+    return event
+
+async def auto_draw_number(number: int) -> bool:
+    """Draw callback for the auto-draw scheduler"""
+    async with AsyncSessionLocal() as db:
+        return await draw_and_publish(db, number) is not None
+
+def dispatch_board_event(announcement: OutboxEvent, event: dict):
+    """Helper function to queue a committed board event for local sockets and the other workers"""
+    outbox.dispatch(announcement, partial(coalescer.submit, "board", flush_board_events, event))
+
+async def refresh_treasure_clue():
+    """Reload the current clue and push it to connected clients"""
+    treasure_clue.invalidate()
+    async with AsyncSessionLocal() as db:
+        payload, _etag = await treasure_clue.get(db)
+    await manager.broadcast_treasure(payload)
+
+async def fetch_user_avatar(user_id: int, gender: str):
+    """Background task: replace a user's placeholder with a validated local copy of a remote avatar"""
+    photo = await avatar_store.fetch_remote(gender)
+    if not photo:
+        return
+
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        if not user:
+            return
+        user.profile_photo = photo
+        await db.commit()
+
+    await publish_user_changes(user)
+
+async def on_remote_user_changes(data: dict):
+    """Apply user changes committed by another worker"""
+    # Re-read the rows rather than trusting the payload: a delayed or replayed
+    # message would otherwise roll a newer committed state back in the index
+    user_ids = [record["user_id"] for record in data["users"]]
+    async with AsyncSessionLocal() as db:
+        users = (await db.execute(select(User).where(User.user_id.in_(user_ids)))).scalars().all()
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+    for user in users:
+        leaderboard_index.upsert(user)
+    for user_id in set(user_ids) - {user.user_id for user in users}:
+        leaderboard_index.remove(user_id)
+    await broadcast_leaderboard_changes()
+
+async def on_remote_treasure_change(_data: dict):
+    """A clue was solved or edited on another worker"""
+    treasure_judge.invalidate()
+    await refresh_treasure_clue()
+
+async def on_remote_tickets_dealt(_data: dict):
+    """Tickets were dealt on another worker"""
+    async with board_state.lock:
+        async with AsyncSessionLocal() as db:
+            await ticket_engine.reload(db, board_state.drawn_numbers)
+
+async def on_remote_auto_draw(record: dict):
+    """Another worker changed or ran the auto-draw schedule"""
+    await auto_draw.apply_remote(record)
+
+async def on_remote_board_event(change: dict):
+    """Mirror draws/clears made on another worker and deliver them with our own sequence numbers"""
+    for event in await board_state.apply_remote(change):
+        await coalescer.submit("board", flush_board_events, event)
+
+avatar_refresh_jobs.on_users_updated = publish_user_changes
+treasure_judge.stage_win = stage_treasure_win
+board_state.on_draw = ticket_engine.on_draw
+board_state.preview_claims = ticket_engine.preview
+board_state.on_clear = ticket_engine.on_clear
+auto_draw.draw_number = auto_draw_number
+auto_draw.on_status = manager.broadcast_auto_draw
+
+broadcast_backend.subscribe("leaderboard", on_remote_user_changes)
+broadcast_backend.subscribe("board", on_remote_board_event)
+broadcast_backend.subscribe("treasure", on_remote_treasure_change)
+broadcast_backend.subscribe("housie", on_remote_tickets_dealt)
+broadcast_backend.subscribe("auto_draw", on_remote_auto_draw)
 
 # Treasure Hunt API endpoints
 
 @router.get("/api/treasure-hunt/current")
-async def get_current_question(request: Request, db: Session = Depends(get_db)):
+async def get_current_question(request: Request, db: AsyncSession = Depends(get_db)):
     """Get the current treasure hunt hint that needs to be solved"""
-    # Find the next unanswered treasure hunt (answered_by = 0)
-    next_treasure = db.query(TreasureHunt).filter(TreasureHunt.answered_by == 0).order_by(TreasureHunt.id).first()
-    
-    if not next_treasure:
-        return {
-            "treasure": None,
-            "message": "No more treasure hunts available!"
-        }
-    
-    # Encrypt hint on the fly (hints are always shown)
-    encrypted_hint = encrypt_answer(next_treasure.hint)
-    
-    return {
-        "treasure": {
-            "id": next_treasure.id,
-            "hint": next_treasure.hint,
-            "encrypted_hint": encrypted_hint,
-            "is_answered": next_treasure.answered_by != 0
-        }
-    }
+    # Served from memory; the encrypted hint is computed once per clue
+    payload, etag = await treasure_clue.get(db)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return FastJSONResponse(payload, headers=cache_headers(etag))
 
 @router.post("/api/treasure-hunt/submit")
-async def submit_treasure_answer(request: Request, db: Session = Depends(get_db)):
+async def submit_treasure_answer(request: Request, db: AsyncSession = Depends(get_db)):
     """Submit a treasure hunt answer"""
     # Parse JSON body
     body = await request.json()
@@ -266,54 +651,23 @@ async def submit_treasure_answer(request: Request, db: Session = Depends(get_db)
     if not answer:
         raise HTTPException(status_code=400, detail="Answer is required")
     
-    # Remove hyphens/dashes and make case-insensitive
-    answer = answer.replace("-", "").replace("_", "").upper()
-    
-    # Get user from cookie
-    username = request.cookies.get('username')
-    if not username:
+    # Get user from the signed session cookie
+    session_user = await get_session_user(request, db)
+    if not session_user:
         raise HTTPException(status_code=401, detail="User not authenticated")
     
-    user = get_user_by_username(db, username)
-    if not user:
+    # The judge compares against the normalized answer in memory and
+    # persists only the first correct submission per clue
+    try:
+        result, winner, announcements = await treasure_judge.submit(session_user.user_id, answer)
+    except LookupError:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Find the next unanswered treasure hunt (answered_by = 0)
-    next_treasure = db.query(TreasureHunt).filter(TreasureHunt.answered_by == 0).order_by(TreasureHunt.id).first()
+    if winner:
+        # Broadcast leaderboard update and the next clue
+        user_changes, treasure_change = announcements
+        apply_user_changes(user_changes, winner)
+        treasure_clue.invalidate()
+        outbox.dispatch(treasure_change, refresh_treasure_clue)
     
-    if not next_treasure:
-        return {
-            "message": "No more treasure hunts available!",
-            "is_correct": False,
-            "treasure_id": None
-        }
-    
-    # Check if answer matches (already normalized to uppercase)
-    is_correct = answer == next_treasure.answer.upper()
-    
-    if is_correct:
-        # Update the treasure hunt with user's answer
-        next_treasure.answered_by = user.user_id
-        
-        # Award points to user
-        points_awarded = 10
-        user.points += points_awarded
-        
-        db.commit()
-        
-        # Broadcast leaderboard update
-        await manager.broadcast_leaderboard(await get_leaderboard_data(db))
-        
-        return {
-            "message": f"Correct answer! You earned {points_awarded} points!",
-            "is_correct": True,
-            "treasure_id": next_treasure.id,
-            "points_awarded": points_awarded
-        }
-    else:
-        return {
-            "message": "Incorrect answer. Try again!",
-            "is_correct": False,
-            "treasure_id": next_treasure.id
-        }
-
+    return result
@@ -1,58 +1,58 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, status
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from main.utils.db import get_db, get_user_by_username, create_user, verify_admin_access
+from sqlalchemy.ext.asyncio import AsyncSession
+from main.utils.db import get_db, get_user_by_username, create_user
 from main.utils.config import settings
-import secrets
+from main.api.game import publish_user_changes, fetch_user_avatar
+from main.utils.avatar_store import avatar_store
+from main.utils.sessions import create_session_token, get_session_user
+from main.utils.static_files import asset_manifest
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
+# {{ asset('css/style.css') }} -> fingerprinted, immutably cached URL
+templates.env.globals["asset"] = asset_manifest.url
 
-def get_current_user_from_cookie(request: Request, db: Session = Depends(get_db)):
-    """Get current user from cookie"""
-    username = request.cookies.get('username')
-    if not username:
-        return None
-    
-    user = get_user_by_username(db, username)
-    return user
+async def get_current_user_from_cookie(request: Request, db: AsyncSession = Depends(get_db)):
+    """Get current user from the signed session cookie"""
+    return await get_session_user(request, db)
 
 @router.get("/", response_class=HTMLResponse)
-async def index(request: Request, db: Session = Depends(get_db)):
+async def index(request: Request, db: AsyncSession = Depends(get_db)):
     """Home page - treasure hunt"""
-    user = get_current_user_from_cookie(request, db)
+    user = await get_current_user_from_cookie(request, db)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
     return templates.TemplateResponse("index.html", {"request": request, "user": user})
 
 @router.get("/leaderboard", response_class=HTMLResponse)
-async def leaderboard(request: Request, db: Session = Depends(get_db)):
+async def leaderboard(request: Request, db: AsyncSession = Depends(get_db)):
     """Leaderboard page"""
-    user = get_current_user_from_cookie(request, db)
+    user = await get_current_user_from_cookie(request, db)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
     return templates.TemplateResponse("leaderboard.html", {"request": request, "user": user})
 
 @router.get("/board", response_class=HTMLResponse)
-async def board(request: Request, db: Session = Depends(get_db)):
+async def board(request: Request, db: AsyncSession = Depends(get_db)):
     """Game board page"""
-    user = get_current_user_from_cookie(request, db)
+    user = await get_current_user_from_cookie(request, db)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
     return templates.TemplateResponse("board.html", {"request": request, "user": user})
 
 @router.get("/admin", response_class=HTMLResponse)
-async def admin(request: Request, db: Session = Depends(get_db)):
+async def admin(request: Request, db: AsyncSession = Depends(get_db)):
     """Admin panel"""
-    user = get_current_user_from_cookie(request, db)
+    user = await get_current_user_from_cookie(request, db)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
     
-    if not verify_admin_access(db, user.username):
+    if user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
     return templates.TemplateResponse("admin.html", {"request": request, "user": user})
@@ -63,7 +63,7 @@ async def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @router.post("/api/login")
-async def login(request: Request, db: Session = Depends(get_db)):
+async def login(request: Request, db: AsyncSession = Depends(get_db)):
     """Handle login/registration"""
     form_data = await request.form()
     username = form_data.get("username", "").strip()
@@ -82,25 +82,27 @@ async def login(request: Request, db: Session = Depends(get_db)):
         real_name = username
     
     # Check if user exists
-    user = get_user_by_username(db, username)
+    user = await get_user_by_username(db, username)
     if not user:
         # Check if new registrations are allowed
         if not settings.ALLOW_NEW_REGISTRATIONS:
             return RedirectResponse(url="/login?error=registration_disabled", status_code=302)
         
         # Create new user with role="user" and gender
-        user = create_user(db, username, real_name, gender, "user")
-    else:
-        # Update existing user's real_name and gender if provided
-        if real_name and real_name != user.real_name:
-            user.real_name = real_name
-        if gender != user.gender:
-            user.gender = gender
-        db.commit()
-        db.refresh(user)
-    
-    # Generate session token
-    session_token = secrets.token_urlsafe(32)
+        user = await create_user(db, username, real_name, gender, "user")
+        # Fetch their real avatar without holding up the login
+        avatar_store.run_in_background(fetch_user_avatar(user.user_id, user.gender))
+        await publish_user_changes(user)
+    elif real_name != user.real_name or gender != user.gender:
+        # Update existing user's real_name and gender if they changed
+        user.real_name = real_name
+        user.gender = gender
+        await db.commit()
+        await db.refresh(user)
+        await publish_user_changes(user)
+    
+    # Signed session token, verified without a DB lookup on later requests
+    session_token = create_session_token(user)
     
     # Create response with redirect
     response = RedirectResponse(url="/", status_code=302)
@@ -133,7 +135,7 @@ async def login(request: Request, db: Session = Depends(get_db)):
     response.set_cookie(
         key="session_token", 
         value=session_token, 
-        max_age=86400,
+        max_age=settings.SESSION_MAX_AGE,
         httponly=False,
         secure=False,
         samesite="lax"
@@ -0,0 +1,184 @@
+from sqlalchemy import update
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import random
+import time
+
+from .config import settings
+from .db import AsyncSessionLocal, AutoDrawState
+from .broadcast_backend import broadcast_backend
+
+
+class AutoDrawScheduler:
+    """Draws numbers on a fixed cadence from a pre-shuffled order of the numbers left.
+
+    State is saved after every change, so a restart resumes mid-game. Only the
+    worker that owns the schedule runs the timer; the others mirror its status.
+    """
+
+    def __init__(self):
+        self.status = "stopped"  # stopped, running, paused or finished
+        self.interval = settings.AUTO_DRAW_INTERVAL
+        # Numbers still to draw, in draw order
+        self.remaining: List[int] = []
+        self.next_draw_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        # Serializes control actions and draws
+        self.lock = asyncio.Lock()
+        # Draws a number; returns False if it had already been drawn
+        self.draw_number: Optional[Callable[[int], Awaitable[bool]]] = None
+        # Called with status_record() after every change
+        self.on_status: Optional[Callable[[dict], Awaitable[None]]] = None
+
+    def status_record(self) -> dict:
+        return {
+            "status": self.status,
+            "interval": self.interval,
+            "remaining": len(self.remaining),
+            "next_draw_at": self.next_draw_at if self.status == "running" else None
+        }
+
+    async def start(self, interval: float, drawn_mask: int) -> dict:
+        """Shuffle every number not drawn yet and start drawing"""
+        async with self.lock:
+            remaining = [number for number in range(1, 91) if not drawn_mask >> number & 1]
+            random.SystemRandom().shuffle(remaining)
+            self.remaining = remaining
+            self.interval = interval
+            self.status = "running" if remaining else "finished"
+            await self._changed()
+        return self.status_record()
+
+    async def pause(self) -> dict:
+        async with self.lock:
+            if self.status == "running":
+                self.status = "paused"
+                await self._changed()
+        return self.status_record()
+
+    async def resume(self) -> dict:
+        async with self.lock:
+            if self.status == "paused":
+                self.status = "running"
+                await self._changed()
+        return self.status_record()
+
+    async def skip(self) -> dict:
+        """Draw the next number now; a running schedule restarts its countdown"""
+        async with self.lock:
+            if self.status in ("running", "paused"):
+                await self._draw_next()
+                await self._changed()
+        return self.status_record()
+
+    async def stop(self) -> dict:
+        async with self.lock:
+            if self.status != "stopped":
+                self.status = "stopped"
+                self.remaining = []
+                await self._changed()
+        return self.status_record()
+
+    async def resume_saved(self, drawn_mask: int):
+        """Pick up a schedule saved before the last shutdown (only one worker wins it)"""
+        async with AsyncSessionLocal() as db:
+            state = await db.get(AutoDrawState, 1)
+            if not state or state.status not in ("running", "paused"):
+                return
+            claimed = await db.execute(
+                update(AutoDrawState)
+                .where(AutoDrawState.id == 1, AutoDrawState.owner == state.owner)
+                .values(owner=broadcast_backend.worker_id)
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                return
+
+        async with self.lock:
+            self.status = state.status
+            self.interval = state.interval
+            self.remaining = [
+                number for number in map(int, filter(None, state.remaining.split(",")))
+                if not drawn_mask >> number & 1
+            ]
+            print(f"Resuming auto-draw ({self.status}, {len(self.remaining)} numbers left)")
+            await self._changed()
+
+    async def apply_remote(self, record: dict):
+        """Another worker took over the schedule; stop our timer and mirror its status"""
+        # Under the lock, so a draw in progress finishes before the timer is cancelled
+        async with self.lock:
+            self._cancel()
+            self.status = record["status"]
+            self.interval = record["interval"]
+            self.remaining = []
+            self.next_draw_at = record["next_draw_at"]
+            if self.on_status:
+                await self.on_status(record)
+
+    async def _changed(self):
+        """Save, restart the timer to match the new status and report it"""
+        self._cancel()
+        if self.status == "running":
+            self.next_draw_at = time.time() + self.interval
+            self.task = asyncio.create_task(self._run())
+        else:
+            self.next_draw_at = None
+        await self._save()
+        record = self.status_record()
+        await broadcast_backend.publish("auto_draw", record)
+        if self.on_status:
+            await self.on_status(record)
+
+    def _cancel(self):
+        if self.task and self.task is not asyncio.current_task():
+            self.task.cancel()
+        self.task = None
+
+    async def _save(self):
+        async with AsyncSessionLocal() as db:
+            await db.merge(AutoDrawState(
+                id=1,
+                status=self.status,
+                interval=self.interval,
+                remaining=",".join(map(str, self.remaining)),
+                owner=broadcast_backend.worker_id
+            ))
+            await db.commit()
+
+    async def _draw_next(self):
+        while self.remaining:
+            number = self.remaining.pop(0)
+            try:
+                if await self.draw_number(number):
+                    break
+            except Exception as e:
+                print(f"Auto-draw of {number} failed: {e}")
+        if not self.remaining:
+            self.status = "finished"
+
+    async def _run(self):
+        # Deadlines come from the loop clock, so draws don't drift with processing time
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.interval
+        while True:
+            await asyncio.sleep(max(0, deadline - loop.time()))
+            async with self.lock:
+                if self.status != "running":
+                    return
+                await self._draw_next()
+                deadline = max(deadline + self.interval, loop.time())
+                self.next_draw_at = time.time() + (deadline - loop.time())
+                if self.status != "running":
+                    self.task = None
+                    await self._changed()
+                    return
+                await self._save()
+                record = self.status_record()
+                await broadcast_backend.publish("auto_draw", record)
+                if self.on_status:
+                    await self.on_status(record)
+
+
+# Global auto-draw scheduler instance
+auto_draw = AutoDrawScheduler()
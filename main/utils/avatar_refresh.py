@@ -0,0 +1,170 @@
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import IntegrityError
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import secrets
+
+from .config import settings
+from .db import AsyncSessionLocal, User, AvatarRefreshJob
+from .avatar_store import avatar_store
+from .broadcast_backend import broadcast_backend
+from .websocket_manager import manager
+
+
+def job_record(job: AvatarRefreshJob) -> dict:
+    """Plain dict describing a job's progress"""
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "total": job.total,
+        "processed": job.processed,
+        "updated": job.updated,
+        "failed": job.failed
+    }
+
+
+class AvatarRefreshJobs:
+    """Refreshes every user's avatar in the background with bounded concurrency.
+
+    Progress is committed after each batch together with a user_id cursor, so a
+    job interrupted by a restart picks up where it stopped. Only one job runs at
+    a time, and only on the worker that owns it.
+    """
+
+    def __init__(self):
+        self.tasks: Dict[str, asyncio.Task] = {}
+        # Called with the users whose avatar changed, so the leaderboard can be updated
+        self.on_users_updated: Optional[Callable[..., Awaitable[None]]] = None
+
+    async def start(self) -> dict:
+        """Start a refresh (or return the one already running) without waiting for it"""
+        async with AsyncSessionLocal() as db:
+            total = (await db.execute(select(func.count(User.user_id)))).scalar()
+            job = AvatarRefreshJob(id=secrets.token_hex(8), status="running", total=total,
+                                   processed=0, updated=0, failed=0, last_user_id=0,
+                                   owner=broadcast_backend.worker_id, active=1)
+            db.add(job)
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another job holds the running slot (possibly just started by another worker)
+                await db.rollback()
+                running = (await db.execute(
+                    select(AvatarRefreshJob).where(AvatarRefreshJob.active == 1)
+                )).scalars().first()
+                if running:
+                    return job_record(running)
+                raise
+
+        self._spawn(job.id)
+        return job_record(job)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        async with AsyncSessionLocal() as db:
+            job = await db.get(AvatarRefreshJob, job_id)
+            return job_record(job) if job else None
+
+    async def resume_interrupted(self):
+        """Restart jobs that were still running when the process stopped (only one worker wins each)"""
+        async with AsyncSessionLocal() as db:
+            jobs = (await db.execute(
+                select(AvatarRefreshJob).where(AvatarRefreshJob.status == "running")
+            )).scalars().all()
+            claimed = []
+            for job in jobs:
+                result = await db.execute(
+                    update(AvatarRefreshJob)
+                    .where(AvatarRefreshJob.id == job.id, AvatarRefreshJob.owner == job.owner)
+                    .values(owner=broadcast_backend.worker_id)
+                )
+                if result.rowcount == 1:
+                    claimed.append(job)
+            await db.commit()
+        for job in claimed:
+            print(f"Resuming avatar refresh job {job.id} after user {job.last_user_id}")
+            self._spawn(job.id)
+
+    def _spawn(self, job_id: str):
+        if job_id not in self.tasks:
+            task = asyncio.create_task(self._run(job_id))
+            self.tasks[job_id] = task
+            task.add_done_callback(lambda _: self.tasks.pop(job_id, None))
+
+    async def _run(self, job_id: str):
+        semaphore = asyncio.Semaphore(settings.AVATAR_FETCH_CONCURRENCY)
+        batch_size = settings.AVATAR_FETCH_CONCURRENCY * 4
+        owned = (AvatarRefreshJob.id == job_id, AvatarRefreshJob.owner == broadcast_backend.worker_id)
+
+        async def fetch(gender: str) -> Optional[str]:
+            async with semaphore:
+                return await avatar_store.fetch_remote(gender)
+
+        try:
+            while True:
+                async with AsyncSessionLocal() as db:
+                    job = (await db.execute(select(AvatarRefreshJob).where(*owned))).scalars().first()
+                    if not job:
+                        print(f"Avatar refresh job {job_id} was taken over by another worker")
+                        return
+                    cursor = job.last_user_id
+                    users = (await db.execute(
+                        select(User.user_id, User.gender).where(User.user_id > cursor).order_by(User.user_id).limit(batch_size)
+                    )).all()
+                    if not users:
+                        job.status = "completed"
+                        job.active = None
+                        await db.commit()
+                        await self._report(job)
+                        print(f"Avatar refresh job {job_id} completed ({job.updated} updated, {job.failed} failed)")
+                        return
+
+                # No session is held while the avatars download
+                photos = await asyncio.gather(*[fetch(user.gender) for user in users])
+                photos = {user.user_id: photo for user, photo in zip(users, photos) if photo}
+
+                async with AsyncSessionLocal() as db:
+                    # Photos and cursor are committed together, so a resumed job never redoes a finished batch;
+                    # the cursor check makes sure nobody else wrote this batch meanwhile
+                    advanced = await db.execute(
+                        update(AvatarRefreshJob)
+                        .where(*owned, AvatarRefreshJob.last_user_id == cursor)
+                        .values(
+                            last_user_id=users[-1].user_id,
+                            processed=AvatarRefreshJob.processed + len(users),
+                            updated=AvatarRefreshJob.updated + len(photos),
+                            failed=AvatarRefreshJob.failed + len(users) - len(photos)
+                        )
+                    )
+                    if advanced.rowcount != 1:
+                        await db.rollback()
+                        print(f"Avatar refresh job {job_id} was taken over by another worker")
+                        return
+                    for user_id, photo in photos.items():
+                        await db.execute(update(User).where(User.user_id == user_id).values(profile_photo=photo))
+                    await db.commit()
+
+                    changed: List[User] = (await db.execute(
+                        select(User).where(User.user_id.in_(photos))
+                    )).scalars().all() if photos else []
+                    job = await db.get(AvatarRefreshJob, job_id)
+
+                if changed and self.on_users_updated:
+                    await self.on_users_updated(*changed)
+                await self._report(job)
+        except asyncio.CancelledError:
+            # Left as "running" so the next startup resumes it
+            raise
+        except Exception as e:
+            print(f"Avatar refresh job {job_id} failed: {e}")
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(AvatarRefreshJob).where(*owned).values(status="failed", active=None))
+                await db.commit()
+                job = await db.get(AvatarRefreshJob, job_id)
+                await self._report(job)
+
+    async def _report(self, job: AvatarRefreshJob):
+        await manager.broadcast_admin("avatar_refresh_progress", job_record(job))
+
+
+# Global avatar refresh job runner
+avatar_refresh_jobs = AvatarRefreshJobs()
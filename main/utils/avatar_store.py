@@ -0,0 +1,144 @@
+from html import escape
+from pathlib import Path
+from typing import Optional, Set
+import asyncio
+import hashlib
+import io
+import random
+
+from .config import settings, BASE_DIR
+from .static_files import write_atomic
+
+AVATAR_DIR = BASE_DIR / "static" / "avatars"
+AVATAR_URL_PREFIX = "/static/avatars/"
+
+# Avatar API image numbers by gender
+GIRL_AVATAR_NUMBERS = [97, 84, 57, 80, 81, 64, 82, 74, 93, 91, 99, 94, 70, 56, 71, 69, 96, 66, 90, 61, 72, 89, 68, 67, 75, 65, 63, 62, 73, 86, 83, 79, 98, 92, 77, 55, 59, 76, 78, 95, 51, 54, 60, 100, 58, 85, 88, 52, 53, 87]
+BOY_AVATAR_NUMBERS = [30, 23, 15, 28, 50, 20, 29, 25, 36, 22, 33, 44, 1, 49, 12, 10, 45, 6, 37, 2, 40, 21, 8, 43, 7, 18, 16, 34, 13, 31, 38, 27, 14, 46, 48, 4, 19, 11, 9, 42, 47, 17, 5, 39, 32, 35, 26, 3, 24, 41]
+
+# Background colours for generated placeholder avatars
+PLACEHOLDER_COLORS = ["#e74c3c", "#e67e22", "#f1c40f", "#2ecc71", "#1abc9c", "#3498db", "#9b59b6", "#34495e"]
+
+# Leading bytes of the image formats we accept from the avatar API
+IMAGE_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": ".png",
+    b"\xff\xd8\xff": ".jpg",
+    b"GIF87a": ".gif",
+    b"GIF89a": ".gif",
+}
+
+
+def remote_avatar_url(gender: Optional[str]) -> str:
+    """Random gender-based avatar API URL (defaults to male if gender is not set)"""
+    if gender and gender.lower() == "female":
+        avatar_number = random.choice(GIRL_AVATAR_NUMBERS)
+    else:
+        avatar_number = random.choice(BOY_AVATAR_NUMBERS)
+    return f"https://avatar.iran.liara.run/public/{avatar_number}"
+
+
+def image_suffix(data: bytes) -> Optional[str]:
+    """File suffix for a supported image, or None if the bytes aren't one"""
+    for signature, suffix in IMAGE_SIGNATURES.items():
+        if data.startswith(signature):
+            return suffix
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+class AvatarStore:
+    """Content-addressed avatar files under static/avatars, filled in without blocking requests"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.client = None
+        # Keep references so background fetches aren't garbage collected mid-flight
+        self.tasks: Set[asyncio.Task] = set()
+
+    def store(self, data: bytes, suffix: str) -> str:
+        """Save bytes under their content hash and return the public URL"""
+        name = hashlib.sha256(data).hexdigest()[:32] + suffix
+        path = self.directory / name
+        if not path.exists():
+            # Write then rename so a half-written file is never served
+            write_atomic(path, data)
+        return AVATAR_URL_PREFIX + name
+
+    def placeholder(self, username: str, real_name: str) -> str:
+        """Instant local avatar (initials on a colour picked from the username)"""
+        initials = "".join(word[0] for word in real_name.split()[:2]).upper() or username[:1].upper()
+        color = PLACEHOLDER_COLORS[int(hashlib.sha1(username.encode()).hexdigest(), 16) % len(PLACEHOLDER_COLORS)]
+        size = settings.AVATAR_THUMB_SIZE
+        svg = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 128 128">'
+            f'<circle cx="64" cy="64" r="64" fill="{color}"/>'
+            f'<text x="64" y="64" dy=".35em" text-anchor="middle" font-family="Arial, sans-serif" '
+            f'font-size="52" font-weight="bold" fill="#ffffff">{escape(initials)}</text></svg>'
+        )
+        return self.store(svg.encode(), ".svg")
+
+    def thumbnail(self, data: bytes) -> Optional[str]:
+        """Validate an image and store a pre-resized copy; None if the image is unusable"""
+        suffix = image_suffix(data)
+        if suffix is None:
+            return None
+
+        try:
+            from PIL import Image
+        except ImportError:
+            # Without Pillow we can still serve the validated original
+            return self.store(data, suffix)
+
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image.load()
+                image.thumbnail((settings.AVATAR_THUMB_SIZE, settings.AVATAR_THUMB_SIZE))
+                output = io.BytesIO()
+                image.save(output, format="PNG", optimize=True)
+        except Exception as e:
+            print(f"Rejected avatar image: {e}")
+            return None
+        return self.store(output.getvalue(), ".png")
+
+    def _get_client(self):
+        if self.client is None:
+            import httpx
+            self.client = httpx.AsyncClient(
+                timeout=settings.AVATAR_FETCH_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=settings.AVATAR_FETCH_CONCURRENCY)
+            )
+        return self.client
+
+    async def fetch_remote(self, gender: Optional[str]) -> Optional[str]:
+        """Download a gender-based avatar and return the local thumbnail URL, or None on failure"""
+        avatar_url = remote_avatar_url(gender)
+        try:
+            response = await self._get_client().get(avatar_url)
+            if response.status_code != 200:
+                raise Exception(f"API returned status {response.status_code}")
+            if len(response.content) > settings.AVATAR_MAX_BYTES:
+                raise Exception(f"image is larger than {settings.AVATAR_MAX_BYTES} bytes")
+        except Exception as e:
+            print(f"Avatar API failed for {avatar_url}: {e}")
+            return None
+
+        # Decoding and resizing is CPU work, keep it off the event loop
+        return await asyncio.to_thread(self.thumbnail, response.content)
+
+    def run_in_background(self, coro):
+        """Start a fire-and-forget avatar task"""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+
+# Global avatar store instance
+avatar_store = AvatarStore(AVATAR_DIR)
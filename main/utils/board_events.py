@@ -0,0 +1,42 @@
+from collections import deque
+from typing import List, Optional
+import secrets
+
+from .config import settings
+
+
+class BoardEventLog:
+    """Short in-memory ring of sequenced board events so reconnecting clients can catch up"""
+
+    def __init__(self, size: int):
+        # The epoch changes every time the process starts, so a client holding a
+        # sequence number from an earlier run knows it must take a full snapshot
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self.events = deque(maxlen=size)
+
+    def append(self, event_type: str, **fields) -> dict:
+        """Record a new board event and return it with its sequence number"""
+        self.seq += 1
+        event = {"seq": self.seq, "epoch": self.epoch, "type": event_type}
+        event.update(fields)
+        self.events.append(event)
+        return event
+
+    def since(self, seq: int, epoch: Optional[str] = None) -> Optional[List[dict]]:
+        """Events after `seq`, or None when the gap is too old (or from another run) to replay"""
+        if epoch is not None and epoch != self.epoch:
+            return None
+        if seq > self.seq:
+            return None
+        if seq == self.seq:
+            return []
+
+        oldest = self.events[0]["seq"] if self.events else self.seq + 1
+        if seq < oldest - 1:
+            return None
+        return [event for event in self.events if event["seq"] > seq]
+
+
+# Global board event log instance
+board_events = BoardEventLog(settings.BOARD_EVENT_RING_SIZE)
@@ -0,0 +1,159 @@
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+
+from .db import SessionLocal, AsyncSessionLocal, HousieNumber, HousieClaim, OutboxEvent
+from .board_events import board_events
+from .number_calls import number_calls
+from .outbox import outbox
+
+
+class BoardState:
+    """Authoritative in-memory Housie board, persisted write-through to housie_numbers"""
+
+    def __init__(self):
+        # Bit n is set once number n (1-90) has been drawn
+        self.drawn_mask = 0
+        # Numbers in the order they were drawn
+        self.drawn_numbers: List[int] = []
+        # number -> id of its housie_numbers row, to tell a redraw after a clear from the original draw
+        self.row_ids: Dict[int, int] = {}
+        # Serializes draws/clears so check-then-insert can't race
+        self.lock = asyncio.Lock()
+        # Called for every draw/clear applied here; on_draw returns claims it completed
+        self.on_draw: Optional[Callable[[int], List[dict]]] = None
+        # Claims a draw would complete, saved in the draw's own transaction
+        self.preview_claims: Optional[Callable[[int], List[dict]]] = None
+        self.on_clear: Optional[Callable[[], None]] = None
+
+    def load(self):
+        """Load the drawn numbers from the database (called once at startup)"""
+        db = SessionLocal()
+        try:
+            rows = db.query(HousieNumber).order_by(HousieNumber.id).all()
+            self.drawn_mask = 0
+            self.drawn_numbers = []
+            self.row_ids = {}
+            for row in rows:
+                if not self.is_drawn(row.number_drawn):
+                    self.drawn_mask |= 1 << row.number_drawn
+                    self.drawn_numbers.append(row.number_drawn)
+                    self.row_ids[row.number_drawn] = row.id
+            print(f"Board state loaded ({len(self.drawn_numbers)} numbers drawn)")
+        finally:
+            db.close()
+
+    def is_drawn(self, number: int) -> bool:
+        return bool(self.drawn_mask >> number & 1)
+
+    @property
+    def current_number(self) -> Optional[int]:
+        return self.drawn_numbers[-1] if self.drawn_numbers else None
+
+    @property
+    def etag(self) -> str:
+        """Changes with every board event, so it identifies the board's contents"""
+        return f'"board-{board_events.epoch}-{board_events.seq}"'
+
+    def snapshot(self) -> dict:
+        """Full board state tagged with the current event sequence number"""
+        return {
+            "seq": board_events.seq,
+            "epoch": board_events.epoch,
+            "current_number": self.current_number,
+            "drawn_numbers": list(self.drawn_numbers),
+            "total_drawn": len(self.drawn_numbers)
+        }
+
+    async def draw(self, db: AsyncSession, number: int) -> Optional[Tuple[dict, OutboxEvent]]:
+        """Draw a number atomically. Returns the board event and its outbox event
+        (to dispatch), or None if it was already drawn."""
+        async with self.lock:
+            if self.is_drawn(number):
+                return None
+
+            # Persist first so memory never runs ahead of the database
+            try:
+                row = HousieNumber(number_drawn=number)
+                db.add(row)
+                if self.preview_claims:
+                    db.add_all([HousieClaim(**claim) for claim in self.preview_claims(number)])
+                announcement = outbox.add(db, "board", {"type": "draw", "number": number})
+                await db.commit()
+            except IntegrityError:
+                # Another worker drew it first; its broadcast will bring us up to date
+                await db.rollback()
+                return None
+            except Exception:
+                await db.rollback()
+                raise
+
+            return self._apply_draw(number, row.id), announcement
+
+    async def clear(self, db: AsyncSession) -> Tuple[dict, OutboxEvent]:
+        """Clear every drawn number and reopen every prize; returns the board event and its outbox event (to dispatch)"""
+        async with self.lock:
+            try:
+                await db.execute(delete(HousieNumber))
+                await db.execute(delete(HousieClaim))
+                announcement = outbox.add(db, "board", {"type": "clear"})
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+            return self._apply_clear(), announcement
+
+    async def apply_remote(self, change: dict) -> List[dict]:
+        """Catch up with draws/clears another worker persisted; returns the board events applied.
+
+        The message only says the board changed. Messages can arrive late (outbox
+        batches and retries), so the rows are re-read from housie_numbers rather
+        than replaying the payload, and a stale clear can't wipe newer draws.
+        """
+        async with self.lock:
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(
+                    select(HousieNumber.number_drawn, HousieNumber.id).order_by(HousieNumber.id)
+                )).all()
+            return self._sync(rows)
+
+    def _sync(self, rows: Sequence[Tuple[int, int]]) -> List[dict]:
+        """Bring memory in line with the (number, row id) pairs in the database"""
+        events = []
+        stored = dict(rows)
+        # A number we hold whose row is gone (or was re-inserted) means the board was cleared
+        if any(stored.get(number) != row_id for number, row_id in self.row_ids.items()):
+            events.append(self._apply_clear())
+        for number, row_id in rows:
+            if not self.is_drawn(number):
+                events.append(self._apply_draw(number, row_id))
+        return events
+
+    def _apply_draw(self, number: int, row_id: int) -> dict:
+        self.drawn_mask |= 1 << number
+        self.drawn_numbers.append(number)
+        self.row_ids[number] = row_id
+        fields = {"number": number}
+        # Pre-rendered call clip, if the number calls are ready
+        audio_url = number_calls.url(number)
+        if audio_url:
+            fields["audio_url"] = audio_url
+        claims = self.on_draw(number) if self.on_draw else []
+        if claims:
+            fields["claims"] = claims
+        return board_events.append("draw", **fields)
+
+    def _apply_clear(self) -> dict:
+        self.drawn_mask = 0
+        self.drawn_numbers = []
+        self.row_ids = {}
+        if self.on_clear:
+            self.on_clear()
+        return board_events.append("clear")
+
+
+# Global board state instance
+board_state = BoardState()
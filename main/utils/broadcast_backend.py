@@ -0,0 +1,134 @@
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import json
+import secrets
+
+from .config import settings
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+class BroadcastBackend:
+    """Forwards state-change messages to the other workers serving the game.
+
+    The publishing worker applies a change and delivers it to its own sockets
+    itself; the backend only carries it to every *other* worker, where the
+    handler subscribed for that channel applies it and delivers locally.
+    """
+
+    def __init__(self):
+        self.worker_id = secrets.token_hex(4)
+        self.handlers: Dict[str, Handler] = {}
+
+    def subscribe(self, channel: str, handler: Handler):
+        """Register the handler for messages published by other workers"""
+        self.handlers[channel] = handler
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, data: dict):
+        raise NotImplementedError
+
+
+class InProcessBackend(BroadcastBackend):
+    """Single worker: there is nobody else to tell"""
+
+    async def publish(self, channel: str, data: dict):
+        return
+
+
+class RedisBackend(BroadcastBackend):
+    """Redis pub/sub backend so several uvicorn workers see each other's changes"""
+
+    def __init__(self, url: str, prefix: str, client=None):
+        super().__init__()
+        self.url = url
+        self.prefix = prefix
+        # A pre-built client (e.g. fakeredis) can be passed in instead of a URL
+        self.redis = client
+        self.pubsub = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.redis is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                raise RuntimeError("BROADCAST_BACKEND=redis requires the 'redis' package")
+            self.redis = redis.from_url(self.url)
+
+        await self._subscribe()
+        self.task = asyncio.create_task(self._reader())
+        print(f"Redis broadcast backend started (worker {self.worker_id})")
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+        if self.pubsub:
+            await self.pubsub.unsubscribe()
+            await self.pubsub.close()
+        if self.redis:
+            await self.redis.close()
+
+    async def publish(self, channel: str, data: dict):
+        message = json.dumps({"origin": self.worker_id, "data": data})
+        await self.redis.publish(self.prefix + channel, message)
+
+    async def _subscribe(self):
+        self.pubsub = self.redis.pubsub()
+        await self.pubsub.subscribe(*[self.prefix + channel for channel in self.handlers])
+
+    async def _reader(self):
+        """Hand messages from other workers to the subscribed handlers, resubscribing if Redis goes away"""
+        delay = settings.REDIS_RECONNECT_DELAY
+        while True:
+            try:
+                if self.pubsub is None:
+                    await self._subscribe()
+                    print("Redis broadcast subscription restored")
+                    delay = settings.REDIS_RECONNECT_DELAY
+                async for message in self.pubsub.listen():
+                    if message["type"] == "message":
+                        await self._handle(message)
+                raise ConnectionError("subscription closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Redis broadcast subscription lost, reconnecting in {delay:.1f}s: {e}")
+                pubsub, self.pubsub = self.pubsub, None
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.REDIS_RECONNECT_MAX_DELAY)
+
+    async def _handle(self, message: dict):
+        try:
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            payload = json.loads(message["data"])
+            if payload["origin"] == self.worker_id:
+                return
+
+            handler = self.handlers.get(channel[len(self.prefix):])
+            if handler:
+                await handler(payload["data"])
+        except Exception as e:
+            print(f"Error handling broadcast from another worker: {e}")
+
+def create_backend() -> BroadcastBackend:
+    """Build the backend selected by BROADCAST_BACKEND"""
+    if settings.BROADCAST_BACKEND == "redis":
+        return RedisBackend(settings.REDIS_URL, settings.REDIS_CHANNEL_PREFIX)
+    return InProcessBackend()
+
+
+# Global broadcast backend instance
+broadcast_backend = create_backend()
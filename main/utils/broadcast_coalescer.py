@@ -0,0 +1,73 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+
+from .config import settings
+
+Flush = Callable[[List[Any]], Awaitable[None]]
+
+
+class PendingBroadcast:
+    """Changes collected for one channel while its coalescing window is open"""
+
+    def __init__(self, now: float, flush: Flush):
+        self.first = now
+        self.deadline = now
+        self.flush = flush
+        self.items: List[Any] = []
+
+
+class BroadcastCoalescer:
+    """Merges bursts of changes into one broadcast per channel.
+
+    Each submit pushes the channel's flush back by `window` seconds, but never
+    past `max_delay` after the first change, so a steady stream of mutations
+    still goes out at a bounded latency.
+    """
+
+    def __init__(self, window: float, max_delay: float):
+        self.window = window
+        self.max_delay = max(max_delay, window)
+        self.pending: Dict[str, PendingBroadcast] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    async def submit(self, channel: str, flush: Flush, item: Optional[Any] = None):
+        """Record a change on `channel`; `flush` later receives every item collected"""
+        if self.window <= 0:
+            # Coalescing disabled - broadcast straight away
+            await flush([item] if item is not None else [])
+            return
+
+        now = asyncio.get_running_loop().time()
+        pending = self.pending.get(channel)
+        if pending is None:
+            pending = self.pending[channel] = PendingBroadcast(now, flush)
+        pending.flush = flush
+        pending.deadline = min(now + self.window, pending.first + self.max_delay)
+        if item is not None:
+            pending.items.append(item)
+
+        if channel not in self.tasks:
+            self.tasks[channel] = asyncio.create_task(self._run(channel))
+
+    async def _run(self, channel: str):
+        """Wait for the channel to go quiet (or hit its deadline), then flush once"""
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = self.pending[channel].deadline - loop.time()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+
+        pending = self.pending.pop(channel)
+        self.tasks.pop(channel, None)
+        try:
+            await pending.flush(pending.items)
+        except Exception as e:
+            print(f"Error flushing {channel} broadcast: {e}")
+
+
+# Global broadcast coalescer instance
+coalescer = BroadcastCoalescer(
+    settings.BROADCAST_COALESCE_WINDOW_MS / 1000,
+    settings.BROADCAST_COALESCE_MAX_DELAY_MS / 1000
+)
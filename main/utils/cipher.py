@@ -0,0 +1,213 @@
+"""Treasure hunt clue cipher.
+
+Letters become their alphabet index (A=0 ... Z=25), a space becomes 100 and
+anything else (punctuation) is kept as is; tokens are comma separated and the
+cipher is case insensitive. Because the separator is itself a comma, a comma
+in the clue shows up as two consecutive empty tokens ("A,B" -> "0,,,1").
+
+Usage:
+    python -m main.utils.cipher encode "Look up"
+    python -m main.utils.cipher decode "11,14,14,10,100,20,15"
+    python -m main.utils.cipher encode < clues.txt      # streams stdin
+    python -m main.utils.cipher bench
+"""
+from typing import Iterable, Iterator, List
+import argparse
+import random
+import string
+import sys
+import timeit
+
+SPACE_CODE = "100"
+SEPARATOR = ","
+
+
+class _EncodeTable(dict):
+    """str.translate table mapping each character to its token plus a separator.
+
+    Letters and space are precomputed; anything else is worked out on first
+    use and remembered, so every character costs one dict lookup.
+    """
+
+    def __missing__(self, codepoint: int) -> str:
+        char = chr(codepoint)
+        if char.isalpha():
+            # Non-ASCII letters keep the historical "offset from A" numbering
+            token = str(codepoint - ord("A"))
+        else:
+            token = char
+        self[codepoint] = token + SEPARATOR
+        return token + SEPARATOR
+
+
+ENCODE_TABLE = _EncodeTable({ord(letter): f"{index}{SEPARATOR}" for index, letter in enumerate(string.ascii_uppercase)})
+ENCODE_TABLE[ord(" ")] = SPACE_CODE + SEPARATOR
+
+DECODE_TABLE = {str(index): letter for index, letter in enumerate(string.ascii_uppercase)}
+DECODE_TABLE[SPACE_CODE] = " "
+
+
+def encode(text: str) -> str:
+    """Encrypt a clue: "Look up" -> "11,14,14,10,100,20,15" """
+    if not text:
+        return ""
+    return text.upper().translate(ENCODE_TABLE)[:-1]
+
+
+def encode_many(texts: Iterable[str]) -> List[str]:
+    """Encrypt a batch of clues"""
+    return [encode(text) for text in texts]
+
+
+def iter_encode(chunks: Iterable[str]) -> Iterator[str]:
+    """Encrypt text arriving in chunks (e.g. lines of a file); the pieces join into encode(whole text)"""
+    started = False
+    for chunk in chunks:
+        if not chunk:
+            continue
+        encoded = chunk.upper().translate(ENCODE_TABLE)
+        # Each chunk ends with a separator; emit it lazily so the last one is dropped
+        yield (SEPARATOR if started else "") + encoded[:-1]
+        started = True
+
+
+def _decode_token(token: str) -> str:
+    char = DECODE_TABLE.get(token)
+    if char is not None:
+        return char
+    if token.isdecimal():
+        # Zero-padded codes still decode; anything out of range is unknown
+        return DECODE_TABLE.get(str(int(token)), "?")
+    return token
+
+
+def _decode_tokens(tokens: Iterable[str]) -> Iterator[str]:
+    empty = 0
+    for token in tokens:
+        stripped = token.strip()
+        if stripped:
+            token = stripped
+        elif not token:
+            # Two empty tokens in a row are an encrypted comma
+            empty += 1
+            continue
+        if empty:
+            yield SEPARATOR * (empty // 2)
+            empty = 0
+        yield _decode_token(token)
+    if empty:
+        yield SEPARATOR * (empty // 2)
+
+
+def decode(encrypted: str) -> str:
+    """Decrypt a clue: "11,14,14,10,100,20,15" -> "LOOK UP" """
+    if not encrypted:
+        return ""
+    return "".join(_decode_tokens(encrypted.split(SEPARATOR)))
+
+
+def decode_many(encrypted: Iterable[str]) -> List[str]:
+    """Decrypt a batch of clues"""
+    return [decode(text) for text in encrypted]
+
+
+def _iter_tokens(chunks: Iterable[str]) -> Iterator[str]:
+    tail = None
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parts = chunk.split(SEPARATOR)
+        if tail is not None:
+            parts[0] = tail + parts[0]
+        # The last part may continue in the next chunk
+        tail = parts.pop()
+        yield from parts
+    if tail is not None:
+        yield tail
+
+
+def iter_decode(chunks: Iterable[str]) -> Iterator[str]:
+    """Decrypt text arriving in chunks; tokens may be split across chunk boundaries"""
+    return _decode_tokens(_iter_tokens(chunks))
+
+
+def _legacy_encode(answer):
+    """The original per-character encrypt_answer, kept as the benchmark baseline"""
+    if not answer:
+        return ""
+    encrypted = []
+    for char in answer.upper():
+        if char == ' ':
+            encrypted.append('100')
+        elif char.isalpha():
+            encrypted.append(str(ord(char) - ord('A')))
+        else:
+            encrypted.append(char)
+    return ','.join(encrypted)
+
+
+def _legacy_decode(encrypted_string):
+    """The original decoder script, kept as the benchmark baseline"""
+    result = []
+    for part in encrypted_string.split(','):
+        part = part.strip()
+        if part == '100':
+            result.append(" ")
+        elif part.isdigit():
+            num = int(part)
+            result.append(chr(num + ord('A')) if 0 <= num <= 25 else "?")
+        else:
+            result.append(part)
+    return "".join(result)
+
+
+def _random_clue(rng: random.Random, length: int) -> str:
+    # Digits are excluded: the cipher cannot tell a literal "5" from "F"
+    alphabet = string.ascii_letters + " " * 8 + ".,!?'-:;()\"&\t"
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def bench(number: int = 20):
+    """Time against the legacy implementation; correctness is covered by tests/test_cipher.py"""
+    rng = random.Random(1)
+    clues = [_random_clue(rng, rng.randint(20, 200)) for _ in range(500)]
+    encrypted = encode_many(clues)
+    cases = [
+        ("encode", lambda: [_legacy_encode(clue) for clue in clues], lambda: encode_many(clues)),
+        ("decode", lambda: [_legacy_decode(text) for text in encrypted], lambda: decode_many(encrypted)),
+    ]
+    for name, legacy, current in cases:
+        legacy_time = min(timeit.repeat(legacy, number=number, repeat=3))
+        current_time = min(timeit.repeat(current, number=number, repeat=3))
+        per_clue = 1e6 / (number * len(clues))
+        print(
+            f"{name}: legacy {legacy_time * per_clue:.2f} us/clue, "
+            f"table {current_time * per_clue:.2f} us/clue ({legacy_time / current_time:.1f}x)"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Treasure hunt clue cipher")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("encode", "decode"):
+        command = commands.add_parser(name, help=f"{name} a clue (reads stdin when no text is given)")
+        command.add_argument("text", nargs="?")
+    commands.add_parser("bench", help="time against the legacy implementation")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench()
+        return
+
+    if args.text is not None:
+        print(encode(args.text) if args.command == "encode" else decode(args.text))
+        return
+
+    stream = iter_encode(sys.stdin) if args.command == "encode" else iter_decode(sys.stdin)
+    for piece in stream:
+        sys.stdout.write(piece)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
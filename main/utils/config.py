@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 import os
+import secrets
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parents[2]
@@ -9,10 +10,93 @@ env_path = BASE_DIR / ".env"
 if env_path.exists():
     load_dotenv(env_path, override=True)
 
+def to_async_url(url: str) -> str:
+    """Map a sync SQLAlchemy URL onto its asyncio driver (aiomysql / aiosqlite)"""
+    if url.startswith("mysql+pymysql://"):
+        return "mysql+aiomysql://" + url[len("mysql+pymysql://"):]
+    if url.startswith("mysql://"):
+        return "mysql+aiomysql://" + url[len("mysql://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
 class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL", "mysql+pymysql://root@localhost:3306/office_games")
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", 8000))
     ALLOW_NEW_REGISTRATIONS: bool = os.getenv("ALLOW_NEW_REGISTRATIONS", "true").lower() == "true"
+    # Worker processes serving the app (uvicorn takes its default --workers from WEB_CONCURRENCY)
+    WORKERS: int = int(os.getenv("WEB_CONCURRENCY", 1))
+    # WebSocket fan-out: per-connection outgoing queue size, send timeout (seconds)
+    # and what to do with slow consumers ("coalesce", "drop_oldest" or "disconnect")
+    WS_SEND_QUEUE_SIZE: int = int(os.getenv("WS_SEND_QUEUE_SIZE", 32))
+    WS_SEND_TIMEOUT: float = float(os.getenv("WS_SEND_TIMEOUT", 10))
+    WS_SLOW_CONSUMER_POLICY: str = os.getenv("WS_SLOW_CONSUMER_POLICY", "coalesce").lower()
+    # Heartbeat: a ping every WS_PING_INTERVAL seconds; connections silent for
+    # WS_PING_INTERVAL + WS_PING_TIMEOUT seconds are reaped
+    WS_PING_INTERVAL: float = float(os.getenv("WS_PING_INTERVAL", 20))
+    WS_PING_TIMEOUT: float = float(os.getenv("WS_PING_TIMEOUT", 10))
+    WS_MAX_CONNECTIONS: int = int(os.getenv("WS_MAX_CONNECTIONS", 2000))
+    WS_MAX_CONNECTIONS_PER_IP: int = int(os.getenv("WS_MAX_CONNECTIONS_PER_IP", 20))
+    # How many recent board events are kept for clients resuming with ?since=<seq>
+    BOARD_EVENT_RING_SIZE: int = int(os.getenv("BOARD_EVENT_RING_SIZE", 128))
+    # How many recent leaderboard patches are kept for clients polling with ?since=<version>
+    LEADERBOARD_PATCH_RING_SIZE: int = int(os.getenv("LEADERBOARD_PATCH_RING_SIZE", 64))
+    # Cross-worker broadcasts: "memory" (single worker) or "redis"
+    BROADCAST_BACKEND: str = os.getenv("BROADCAST_BACKEND", "memory").lower()
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    REDIS_CHANNEL_PREFIX: str = os.getenv("REDIS_CHANNEL_PREFIX", "funthursday:")
+    # Backoff (seconds) between attempts to resubscribe after losing Redis
+    REDIS_RECONNECT_DELAY: float = float(os.getenv("REDIS_RECONNECT_DELAY", 0.5))
+    REDIS_RECONNECT_MAX_DELAY: float = float(os.getenv("REDIS_RECONNECT_MAX_DELAY", 30))
+    # Outbox publisher: events per batch, retry backoff (seconds) and how old an
+    # unpublished event must be before another worker takes it over
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+    OUTBOX_RETRY_DELAY: float = float(os.getenv("OUTBOX_RETRY_DELAY", 0.5))
+    OUTBOX_RETRY_MAX_DELAY: float = float(os.getenv("OUTBOX_RETRY_MAX_DELAY", 30))
+    OUTBOX_STALE_AFTER: float = float(os.getenv("OUTBOX_STALE_AFTER", 30))
+    # Merge broadcasts made within this window (ms) into one message per channel,
+    # delaying any change by at most the max delay; a window of 0 disables it
+    BROADCAST_COALESCE_WINDOW_MS: int = int(os.getenv("BROADCAST_COALESCE_WINDOW_MS", 75))
+    BROADCAST_COALESCE_MAX_DELAY_MS: int = int(os.getenv("BROADCAST_COALESCE_MAX_DELAY_MS", 250))
+    # Local avatar store: thumbnail edge (px), largest accepted download and fetch limits
+    AVATAR_THUMB_SIZE: int = int(os.getenv("AVATAR_THUMB_SIZE", 128))
+    AVATAR_MAX_BYTES: int = int(os.getenv("AVATAR_MAX_BYTES", 1024 * 1024))
+    AVATAR_FETCH_TIMEOUT: float = float(os.getenv("AVATAR_FETCH_TIMEOUT", 5))
+    AVATAR_FETCH_CONCURRENCY: int = int(os.getenv("AVATAR_FETCH_CONCURRENCY", 8))
+    # Session tokens are signed with SECRET_KEY; set it explicitly so sessions survive
+    # restarts and are shared between workers (a random key is used otherwise)
+    SECRET_KEY: str = os.getenv("SECRET_KEY") or secrets.token_urlsafe(32)
+    SECRET_KEY_SET: bool = bool(os.getenv("SECRET_KEY"))
+    SESSION_MAX_AGE: int = int(os.getenv("SESSION_MAX_AGE", 86400))
+    # In-process user record cache used for page and API auth
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", 1024))
+    USER_CACHE_TTL: float = float(os.getenv("USER_CACHE_TTL", 60))
+    # Admin user listing: default and largest page size
+    USERS_PAGE_SIZE: int = int(os.getenv("USERS_PAGE_SIZE", 50))
+    USERS_PAGE_MAX: int = int(os.getenv("USERS_PAGE_MAX", 200))
+    # Housie tickets dealt to each player
+    HOUSIE_TICKETS_PER_USER: int = int(os.getenv("HOUSIE_TICKETS_PER_USER", 1))
+    # Default seconds between automatic draws
+    AUTO_DRAW_INTERVAL: float = float(os.getenv("AUTO_DRAW_INTERVAL", 15))
+    # Number-call audio: TTS_ENGINE is auto, espeak, pyttsx3 or none
+    TTS_ENGINE: str = os.getenv("TTS_ENGINE", "auto")
+    TTS_VOICE: str = os.getenv("TTS_VOICE", "en")
+    TTS_RATE: int = int(os.getenv("TTS_RATE", 150))
 
 settings = Settings()
+
+
+def check_secret_key():
+    """Refuse to start on a random SECRET_KEY when several processes must share it"""
+    if settings.SECRET_KEY_SET:
+        return
+    if settings.WORKERS > 1 or settings.BROADCAST_BACKEND == "redis":
+        # Each worker would sign sessions with its own key and reject the others'
+        raise RuntimeError(
+            "SECRET_KEY must be set when running several workers "
+            "(WEB_CONCURRENCY > 1 or BROADCAST_BACKEND=redis)"
+        )
+    print("⚠️  WARNING: SECRET_KEY is not set; using a random key, so every restart logs all users out. "
+          "Set SECRET_KEY before running more than one worker.")
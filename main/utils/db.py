@@ -1,69 +1,46 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, text
-from sqlalchemy.orm import sessionmaker, declarative_base, scoped_session, relationship, Session
+from sqlalchemy import create_engine, select, Column, Integer, Float, String, Text, ForeignKey, text
+from sqlalchemy.orm import sessionmaker, declarative_base, scoped_session, relationship
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from fastapi import HTTPException, status
 from .config import settings
+from .avatar_store import avatar_store
 from datetime import datetime
 
+# Synchronous engine for startup and maintenance jobs
 engine = create_engine(settings.DATABASE_URL, echo=True)
 SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+
+# Async engine for request handlers, so queries don't stall the event loop
+async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, echo=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
 
 
-def create_user(db: Session, username: str, real_name: str, gender: str = "male", role: str = "user"):
+async def create_user(db: AsyncSession, username: str, real_name: str, gender: str = "male", role: str = "user"):
     try:
         # Check if user already exists
-        existing_user = get_user_by_username(db, username)
+        existing_user = await get_user_by_username(db, username)
         if existing_user:
             # Update the real_name, gender and role for existing user
             existing_user.real_name = real_name
             existing_user.gender = gender
             existing_user.role = role
-            db.commit()
-            db.refresh(existing_user)
+            await db.commit()
+            await db.refresh(existing_user)
             return existing_user
         
-        # Create new user with gender-based avatar
-        import random
-        import requests
-        
-        # Use avatar API based on gender with random numbers
-        if gender.lower() == "female":
-            # Girl avatar numbers
-            girl_numbers = [97, 84, 57, 80, 81, 64, 82, 74, 93, 91, 99, 94, 70, 56, 71, 69, 96, 66, 90, 61, 72, 89, 68, 67, 75, 65, 63, 62, 73, 86, 83, 79, 98, 92, 77, 55, 59, 76, 78, 95, 51, 54, 60, 100, 58, 85, 88, 52, 53, 87]
-            avatar_number = random.choice(girl_numbers)
-        else:
-            # Boy avatar numbers
-            boy_numbers = [30, 23, 15, 28, 50, 20, 29, 25, 36, 22, 33, 44, 1, 49, 12, 10, 45, 6, 37, 2, 40, 21, 8, 43, 7, 18, 16, 34, 13, 31, 38, 27, 14, 46, 48, 4, 19, 11, 9, 42, 47, 17, 5, 39, 32, 35, 26, 3, 24, 41]
-            avatar_number = random.choice(boy_numbers)
-        
-        avatar_url = f"https://avatar.iran.liara.run/public/{avatar_number}"
-        
-        # Try to use API avatar first
-        photo = avatar_url  # Default to API URL
-        
-        # Fallback to local avatars if API fails
-        try:
-            # Test if API is accessible
-            response = requests.get(avatar_url, timeout=5)
-            if response.status_code != 200:
-                raise Exception(f"API returned status {response.status_code}")
-            print(f"Successfully using API avatar: {avatar_url}")
-        except Exception as e:
-            # Fallback to local avatars
-            print(f"API failed ({str(e)}), using local avatar")
-            PROFILE_IMAGES = [f"/static/images/avatar{i}.png" for i in range(1, 41)]
-            photo = random.choice(PROFILE_IMAGES)
+        # Start with an instant local avatar; the real one is fetched in the background
+        photo = avatar_store.placeholder(username, real_name)
         
         user = User(
             username=username, 
@@ -74,17 +51,17 @@ def create_user(db: Session, username: str, real_name: str, gender: str = "male"
             points=0
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         return user
     except Exception as e:
         print(f"Create user error: {str(e)}")  # Debug logging
-        db.rollback()
+        await db.rollback()
         raise e
 
 
-def verify_admin_access(db: Session, username: str) -> bool:
-    user = get_user_by_username(db, username)
+async def verify_admin_access(db: AsyncSession, username: str) -> bool:
+    user = await get_user_by_username(db, username)
     return user and user.role == "admin"
 
 
@@ -119,6 +96,10 @@ def create_tables():
         # Add gender column to existing users if it doesn't exist
         add_gender_column_if_not_exists()
         
+        # Add indexes introduced after the tables were first created
+        add_user_indexes_if_not_exists()
+        add_housie_number_index_if_not_exists()
+        
         # Add sample treasure hunt data
         add_sample_treasure_hunt_data()
         
@@ -216,83 +197,36 @@ def add_gender_column_if_not_exists():
                 print("Gender column added to users table")
             else:
                 print("Gender column already exists")
-                
-            # Update existing users with new avatars if they have old local paths
-            update_existing_user_avatars()
     except Exception as e:
         print(f"Error adding gender column: {str(e)}")
         # Don't raise the error as this is not critical
 
 
-def encrypt_answer(answer):
-    """
-    Encrypt answer using the specified algorithm:
-    - Letters: A=0, B=1, ..., Z=25
-    - Numbers are comma-separated
-    - Space is represented as 100
-    - Case insensitive
-    - Punctuation marks are kept as is
-    """
-    if not answer:
-        return ""
-    
-    encrypted = []
-    for char in answer.upper():
-        if char == ' ':
-            encrypted.append('100')
-        elif char.isalpha():
-            # A=0, B=1, ..., Z=25 (no subtraction needed)
-            num = ord(char) - ord('A')
-            encrypted.append(str(num))
-        else:
-            # For non-alphabetic characters (punctuation), keep as is
-            encrypted.append(char)
-    
-    return ','.join(encrypted)
-
-def update_existing_user_avatars():
-    """Update existing users with new gender-based avatars"""
+def add_user_indexes_if_not_exists():
+    """Create the users indexes on tables that predate them (create_all skips existing tables)"""
     try:
-        import random
-        import requests
-        db = SessionLocal()
-        users = db.query(User).all()
-        
-        print(f"Found {len(users)} users to check for avatar updates")
-        
-        for user in users:
-            # Update ALL users with new avatar system (not just old ones)
-            print(f"Updating avatar for user {user.username} (gender: {user.gender})")
-            
-            if user.gender and user.gender.lower() == "female":
-                # Girl avatar numbers
-                girl_numbers = [97, 84, 57, 80, 81, 64, 82, 74, 93, 91, 99, 94, 70, 56, 71, 69, 96, 66, 90, 61, 72, 89, 68, 67, 75, 65, 63, 62, 73, 86, 83, 79, 98, 92, 77, 55, 59, 76, 78, 95, 51, 54, 60, 100, 58, 85, 88, 52, 53, 87]
-                avatar_number = random.choice(girl_numbers)
-            else:
-                # Boy avatar numbers (default to male if gender not set)
-                boy_numbers = [30, 23, 15, 28, 50, 20, 29, 25, 36, 22, 33, 44, 1, 49, 12, 10, 45, 6, 37, 2, 40, 21, 8, 43, 7, 18, 16, 34, 13, 31, 38, 27, 14, 46, 48, 4, 19, 11, 9, 42, 47, 17, 5, 39, 32, 35, 26, 3, 24, 41]
-                avatar_number = random.choice(boy_numbers)
-            
-            avatar_url = f"https://avatar.iran.liara.run/public/{avatar_number}"
-            
-            # Test if API is accessible
-            try:
-                response = requests.get(avatar_url, timeout=5)
-                if response.status_code == 200:
-                    old_avatar = user.profile_photo
-                    user.profile_photo = avatar_url
-                    print(f"  ✅ Updated {user.username}: {old_avatar} -> {avatar_url}")
-                else:
-                    print(f"  ❌ API returned status {response.status_code} for user {user.username}")
-            except Exception as e:
-                print(f"  ❌ API error for user {user.username}: {str(e)}")
-        
-        db.commit()
-        print(f"✅ Avatar update completed for {len(users)} users")
+        for index in User.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
     except Exception as e:
-        print(f"❌ Error updating existing user avatars: {str(e)}")
-    finally:
-        db.close()
+        print(f"Error adding user indexes: {str(e)}")
+        # Don't raise the error as this is not critical
+
+
+def add_housie_number_index_if_not_exists():
+    """Make drawn numbers unique on tables that predate the constraint (create_all skips existing tables)"""
+    try:
+        with engine.begin() as conn:
+            # Keep the first draw of any number drawn twice, or the unique index can't be built
+            conn.execute(text("""
+                DELETE FROM housie_numbers WHERE id NOT IN (
+                    SELECT id FROM (SELECT MIN(id) AS id FROM housie_numbers GROUP BY number_drawn) AS first_draws
+                )
+            """))
+        for index in HousieNumber.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
+    except Exception as e:
+        print(f"Error adding housie number index: {str(e)}")
+        # Don't raise the error as this is not critical
 
 
 class User(Base):
@@ -300,7 +234,7 @@ class User(Base):
     user_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     username = Column(String(50), unique=True, nullable=False)
     role = Column(String(50), nullable=False, default="user")
-    real_name = Column(String(100), nullable=False)
+    real_name = Column(String(100), nullable=False, index=True)  # Indexed for admin search by name prefix
     gender = Column(String(10), nullable=False, default="male")  # male or female
     profile_photo = Column(String(255))
     points = Column(Integer, default=0)
@@ -310,7 +244,42 @@ class User(Base):
 class HousieNumber(Base):
     __tablename__ = "housie_numbers"
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    number_drawn = Column(Integer, nullable=False)
+    number_drawn = Column(Integer, nullable=False, unique=True, index=True)  # Unique index: two workers can't draw the same number
+
+
+class HousieTicket(Base):
+    __tablename__ = "housie_tickets"
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    rows = Column(String(72), nullable=False)  # Three row bitmasks (bit n = number n), hex, comma separated
+
+
+class HousieClaim(Base):
+    __tablename__ = "housie_claims"
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    ticket_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    real_name = Column(String(100), nullable=False)
+    pattern = Column(String(20), nullable=False)  # early_five, top_line, middle_line, bottom_line or full_house
+    number = Column(Integer, nullable=False)  # The number that completed the pattern
+
+
+class AutoDrawState(Base):
+    __tablename__ = "auto_draw_state"
+    id = Column(Integer, primary_key=True)  # Single row, id = 1
+    status = Column(String(20), nullable=False, default="stopped")  # stopped, running, paused or finished
+    interval = Column(Float, nullable=False)  # Seconds between draws
+    remaining = Column(String(300), nullable=False, default="")  # Numbers still to draw, in order, comma separated
+    owner = Column(String(32))  # Worker running the timer
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    channel = Column(String(32), nullable=False)  # Broadcast channel, e.g. leaderboard or board
+    payload = Column(Text, nullable=False)  # JSON message for the other workers
+    owner = Column(String(32), nullable=False, index=True)  # Worker that publishes it
+    created_at = Column(Float, nullable=False)  # Unix time of the commit
 
 
 class TreasureHunt(Base):
@@ -320,3 +289,16 @@ class TreasureHunt(Base):
     answer = Column(String(255), nullable=False)  # Correct answer
     answered_by = Column(Integer, default=0)  # 0 = not answered, user_id = answered by user
     hint_shown = Column(Integer, default=1)  # 1 = always shown (hints are always visible)
+
+
+class AvatarRefreshJob(Base):
+    __tablename__ = "avatar_refresh_jobs"
+    id = Column(String(32), primary_key=True)
+    status = Column(String(20), nullable=False, default="running")  # running, completed or failed
+    total = Column(Integer, default=0)
+    processed = Column(Integer, default=0)
+    updated = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    last_user_id = Column(Integer, default=0)  # Resume cursor: every user up to this id is done
+    owner = Column(String(32))  # Worker running the job
+    active = Column(Integer, unique=True)  # 1 while running, NULL after; the unique index allows one running job
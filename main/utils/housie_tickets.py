@@ -0,0 +1,235 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import random
+
+from .db import SessionLocal, HousieTicket, HousieClaim, User
+
+# Number ranges of the nine ticket columns: 1-9, 10-19, ..., 70-79, 80-90
+COLUMN_RANGES = [(1, 9)] + [(10 * column, 10 * column + 9) for column in range(1, 8)] + [(80, 90)]
+NUMBERS_PER_ROW = 5
+NUMBERS_PER_TICKET = 15
+
+# Winning patterns in the order they are announced
+PATTERNS = ("early_five", "top_line", "middle_line", "bottom_line", "full_house")
+LINE_PATTERNS = ("top_line", "middle_line", "bottom_line")
+
+_rng = random.SystemRandom()
+
+
+def column_of(number: int) -> int:
+    return min(number // 10, 8)
+
+
+def numbers_in(mask: int) -> List[int]:
+    """Numbers whose bits are set in a mask, ascending"""
+    numbers = []
+    while mask:
+        low = mask & -mask
+        numbers.append(low.bit_length() - 1)
+        mask ^= low
+    return numbers
+
+
+def generate_ticket(rng: random.Random = _rng) -> List[int]:
+    """A valid 3x9 Housie ticket as three row bitmasks (bit n set = number n on that row).
+
+    Every row has five numbers, every column one to three, and numbers in a
+    column increase from top to bottom.
+    """
+    counts = [1] * 9
+    extra = NUMBERS_PER_TICKET - 9
+    while extra:
+        column = rng.randrange(9)
+        if counts[column] < 3:
+            counts[column] += 1
+            extra -= 1
+
+    # Fill the fullest columns first, each into the rows with the most room left
+    capacity = [NUMBERS_PER_ROW] * 3
+    rows = [0, 0, 0]
+    for column in sorted(range(9), key=lambda c: (-counts[c], rng.random())):
+        chosen = sorted(sorted(range(3), key=lambda r: (-capacity[r], rng.random()))[:counts[column]])
+        low, high = COLUMN_RANGES[column]
+        numbers = sorted(rng.sample(range(low, high + 1), counts[column]))
+        for row, number in zip(chosen, numbers):
+            capacity[row] -= 1
+            rows[row] |= 1 << number
+    return rows
+
+
+def encode_rows(rows: List[int]) -> str:
+    return ",".join(format(mask, "x") for mask in rows)
+
+
+def decode_rows(value: str) -> List[int]:
+    return [int(mask, 16) for mask in value.split(",")]
+
+
+class TicketState:
+    """A dealt ticket plus how many of its numbers have been drawn"""
+
+    __slots__ = ("ticket_id", "user_id", "owner", "rows", "row_hits", "hits")
+
+    def __init__(self, ticket_id: int, user_id: int, owner: str, rows: List[int]):
+        self.ticket_id = ticket_id
+        self.user_id = user_id
+        self.owner = owner
+        self.rows = rows
+        self.row_hits = [0, 0, 0]
+        self.hits = 0
+
+    def grid(self) -> List[List[Optional[int]]]:
+        """3x9 layout for display; None marks a blank cell"""
+        grid = []
+        for mask in self.rows:
+            cells = [None] * 9
+            for number in numbers_in(mask):
+                cells[column_of(number)] = number
+            grid.append(cells)
+        return grid
+
+
+class TicketEngine:
+    """Tracks every ticket against the drawn numbers and detects winning patterns.
+
+    An inverted index (number -> tickets holding it) means a draw only touches
+    the tickets that contain the drawn number.
+    """
+
+    def __init__(self):
+        self.tickets: Dict[int, TicketState] = {}
+        self.by_user: Dict[int, List[TicketState]] = {}
+        # number -> [(ticket, row)] for every ticket holding that number
+        self.index: List[List[Tuple[TicketState, int]]] = [[] for _ in range(91)]
+        # Patterns already won this game, and the claims that won them
+        self.claimed: Set[str] = set()
+        self.claims: List[dict] = []
+
+    def load(self, drawn_numbers: Iterable[int]):
+        """Load tickets and claims from the database and replay the numbers drawn so far (called once at startup)"""
+        db = SessionLocal()
+        try:
+            rows = db.query(HousieTicket, User.real_name).join(User, User.user_id == HousieTicket.user_id).all()
+            claims = db.query(HousieClaim).order_by(HousieClaim.id).all()
+            self._build(rows, claims, drawn_numbers)
+            print(f"Housie tickets loaded ({len(self.tickets)} tickets, {len(self.claims)} claims)")
+        finally:
+            db.close()
+
+    async def reload(self, db: AsyncSession, drawn_numbers: Iterable[int]):
+        """Reload after tickets were dealt on another worker"""
+        rows = (await db.execute(
+            select(HousieTicket, User.real_name).join(User, User.user_id == HousieTicket.user_id)
+        )).all()
+        claims = (await db.execute(select(HousieClaim).order_by(HousieClaim.id))).scalars().all()
+        self._build(rows, claims, drawn_numbers)
+
+    def _build(self, rows, claims, drawn_numbers: Iterable[int]):
+        self.tickets = {}
+        self.by_user = {}
+        self.index = [[] for _ in range(91)]
+        for ticket, real_name in rows:
+            self._add(TicketState(ticket.id, ticket.user_id, real_name, decode_rows(ticket.rows)))
+        for number in drawn_numbers:
+            self._mark(number)
+        # Claims were settled when they happened; replaying must not award them again
+        self.claims = [claim_record(claim) for claim in claims]
+        self.claimed = {claim["pattern"] for claim in self.claims}
+
+    def add(self, ticket: HousieTicket, owner: str, drawn_mask: int) -> TicketState:
+        """Index a newly dealt ticket, counting the numbers already drawn"""
+        state = TicketState(ticket.id, ticket.user_id, owner, decode_rows(ticket.rows))
+        self._add(state)
+        state.row_hits = [bin(mask & drawn_mask).count("1") for mask in state.rows]
+        state.hits = sum(state.row_hits)
+        return state
+
+    def _add(self, state: TicketState):
+        self.tickets[state.ticket_id] = state
+        self.by_user.setdefault(state.user_id, []).append(state)
+        for row, mask in enumerate(state.rows):
+            for number in numbers_in(mask):
+                self.index[number].append((state, row))
+
+    def _mark(self, number: int, step: int = 1) -> List[TicketState]:
+        touched = []
+        for state, row in self.index[number]:
+            state.row_hits[row] += step
+            state.hits += step
+            touched.append(state)
+        return touched
+
+    def preview(self, number: int) -> List[dict]:
+        """The claims drawing a number would complete, without counting it (so they can be saved with the draw)"""
+        touched = self._mark(number)
+        try:
+            return self._claims(touched, number)
+        finally:
+            self._mark(number, -1)
+
+    def on_draw(self, number: int) -> List[dict]:
+        """Count a drawn number and return the claims it completes"""
+        claims = self._claims(self._mark(number), number)
+        self.claimed |= {claim["pattern"] for claim in claims}
+        self.claims.extend(claims)
+        return claims
+
+    def _claims(self, touched: List[TicketState], number: int) -> List[dict]:
+        claims = []
+        for state in touched:
+            for pattern in self._completed(state):
+                if pattern in self.claimed:
+                    continue
+                # Everyone completing a pattern on the same number shares it
+                claims.append({
+                    "pattern": pattern,
+                    "ticket_id": state.ticket_id,
+                    "user_id": state.user_id,
+                    "real_name": state.owner,
+                    "number": number
+                })
+        claims.sort(key=lambda claim: PATTERNS.index(claim["pattern"]))
+        return claims
+
+    def _completed(self, state: TicketState) -> List[str]:
+        # At least, not exactly: a ticket dealt mid-game may already be past a
+        # pattern, and wins it on its next number unless someone claimed it first
+        patterns = []
+        if state.hits >= NUMBERS_PER_ROW:
+            patterns.append("early_five")
+        for row, pattern in enumerate(LINE_PATTERNS):
+            if state.row_hits[row] >= NUMBERS_PER_ROW:
+                patterns.append(pattern)
+        if state.hits >= NUMBERS_PER_TICKET:
+            patterns.append("full_house")
+        return patterns
+
+    def on_clear(self):
+        """A new game: reset every counter and reopen every pattern"""
+        for state in self.tickets.values():
+            state.row_hits = [0, 0, 0]
+            state.hits = 0
+        self.claimed = set()
+        self.claims = []
+
+    def reset(self):
+        """Forget every ticket and claim (before dealing a fresh set)"""
+        self._build([], [], [])
+
+    def tickets_for(self, user_id: int) -> List[TicketState]:
+        return self.by_user.get(user_id, [])
+
+
+def claim_record(claim: HousieClaim) -> dict:
+    return {
+        "pattern": claim.pattern,
+        "ticket_id": claim.ticket_id,
+        "user_id": claim.user_id,
+        "real_name": claim.real_name,
+        "number": claim.number
+    }
+
+
+# Global ticket engine instance
+ticket_engine = TicketEngine()
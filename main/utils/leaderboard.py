@@ -0,0 +1,203 @@
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import secrets
+
+from .config import settings
+from .db import SessionLocal, User
+
+
+def user_record(user: User) -> dict:
+    """Plain dict with everything the leaderboard needs to know about a user"""
+    return {
+        "user_id": user.user_id,
+        "username": user.username,
+        "real_name": user.real_name,
+        "profile_photo": user.profile_photo,
+        "points": user.points,
+        "role": user.role,
+        "is_deleted": user.is_deleted
+    }
+
+
+class LeaderboardIndex:
+    """In-memory ranked leaderboard, kept sorted by (points desc, user_id) and updated incrementally"""
+
+    def __init__(self, patch_ring_size: int):
+        # Sorted (-points, user_id) keys; position + 1 is the rank
+        self.keys: List[Tuple[int, int]] = []
+        # user_id -> leaderboard row (without rank)
+        self.entries: Dict[int, dict] = {}
+        # username -> user_id, for "around me" lookups
+        self.user_ids: Dict[str, int] = {}
+        # Bumped every time a patch is taken; clients apply patches in version order.
+        # Versions are only meaningful within one epoch (one process run)
+        self.epoch = secrets.token_hex(4)
+        self.version = 0
+        # Bumped by every upsert/remove, so it changes as soon as the contents do
+        # (the version only moves when a patch is taken)
+        self.revision = 0
+        # Recent patches, so polling clients can catch up without a full snapshot
+        self.patches = deque(maxlen=patch_ring_size)
+        # Range of positions whose row (rank or points) changed since the last patch
+        self._dirty_lo: Optional[int] = None
+        self._dirty_hi: Optional[int] = None
+        self._removed: set = set()
+
+    def load(self):
+        """Build the index from the database (called once at startup)"""
+        db = SessionLocal()
+        try:
+            self.keys = []
+            self.entries = {}
+            self.user_ids = {}
+            for user in db.query(User).filter(User.role != "admin", User.is_deleted == 0).all():
+                self.upsert(user)
+            self._dirty_lo = self._dirty_hi = None
+            self._removed = set()
+            print(f"Leaderboard index loaded ({len(self.keys)} players)")
+        finally:
+            db.close()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @staticmethod
+    def _key(entry: dict, user_id: int) -> Tuple[int, int]:
+        return (-entry["points"], user_id)
+
+    def _mark_dirty(self, lo: int, hi: int):
+        self._dirty_lo = lo if self._dirty_lo is None else min(self._dirty_lo, lo)
+        self._dirty_hi = hi if self._dirty_hi is None else max(self._dirty_hi, hi)
+
+    def upsert(self, user: User):
+        """Insert or move a user after a change; admins and soft-deleted users are removed"""
+        if user.role == "admin" or user.is_deleted:
+            self.remove(user.user_id)
+            return
+
+        entry = {
+            "username": user.username,
+            "real_name": user.real_name,
+            "profile_photo": user.profile_photo,
+            "points": user.points or 0
+        }
+        if self.entries.get(user.user_id) == entry:
+            # Nothing shown on the leaderboard changed; keep the ETag and caches valid
+            return
+
+        self.revision += 1
+        old_position = self._pop(user.user_id)
+        self.entries[user.user_id] = entry
+        self.user_ids[user.username] = user.user_id
+        key = self._key(entry, user.user_id)
+        position = bisect_left(self.keys, key)
+        self.keys.insert(position, key)
+        self._removed.discard(user.username)
+
+        if old_position is None:
+            # A new row shifts everyone below it down one rank
+            self._mark_dirty(position, len(self.keys) - 1)
+        else:
+            # A moved row only shifts the rows between its old and new rank
+            self._mark_dirty(min(old_position, position), max(old_position, position))
+
+    def remove(self, user_id: int):
+        """Drop a user from the index if present"""
+        username = self.entries[user_id]["username"] if user_id in self.entries else None
+        position = self._pop(user_id)
+        if position is None:
+            return
+        self.revision += 1
+        self._removed.add(username)
+        # Everyone below the removed row moves up one rank
+        self._mark_dirty(position, len(self.keys))
+
+    def _pop(self, user_id: int) -> Optional[int]:
+        """Remove a user's key and row, returning the position it held"""
+        entry = self.entries.pop(user_id, None)
+        if entry is None:
+            return None
+        self.user_ids.pop(entry["username"], None)
+        position = bisect_left(self.keys, self._key(entry, user_id))
+        del self.keys[position]
+        return position
+
+    def rank_of(self, username: str) -> Optional[int]:
+        """1-based rank of a user, or None if they are not on the leaderboard"""
+        user_id = self.user_ids.get(username)
+        if user_id is None:
+            return None
+        return bisect_left(self.keys, self._key(self.entries[user_id], user_id)) + 1
+
+    def _rows(self, start: int, stop: int) -> List[dict]:
+        rows = []
+        for position in range(start, min(stop, len(self.keys))):
+            user_id = self.keys[position][1]
+            row = {"rank": position + 1}
+            row.update(self.entries[user_id])
+            rows.append(row)
+        return rows
+
+    def top(self, limit: Optional[int] = None, offset: int = 0) -> List[dict]:
+        """Rows from rank offset + 1, at most `limit` of them (all when limit is None)"""
+        stop = len(self.keys) if limit is None else offset + limit
+        return self._rows(offset, stop)
+
+    def around(self, username: str, window: int) -> List[dict]:
+        """Rows within `window` ranks either side of a user"""
+        rank = self.rank_of(username)
+        if rank is None:
+            return []
+        return self._rows(max(rank - 1 - window, 0), rank + window)
+
+    @property
+    def etag(self) -> str:
+        """Identifies the current contents (not just the last patch)"""
+        return f'"lb-{self.epoch}-{self.revision}"'
+
+    def snapshot(self) -> dict:
+        """Full leaderboard tagged with the current version"""
+        return {
+            "leaderboard": self.top(),
+            "version": self.version,
+            "epoch": self.epoch,
+            "total": len(self.keys)
+        }
+
+    def patches_since(self, version: int, epoch: Optional[str] = None) -> Optional[List[dict]]:
+        """Patches after `version`, or None when the gap is too old (or from another run) to replay"""
+        if epoch is not None and epoch != self.epoch:
+            return None
+        if version > self.version:
+            return None
+        if version == self.version:
+            return []
+
+        oldest = self.patches[0]["version"] if self.patches else self.version + 1
+        if version < oldest - 1:
+            return None
+        return [patch for patch in self.patches if patch["version"] > version]
+
+    def take_patch(self) -> Optional[dict]:
+        """Rows whose rank or points changed since the last patch, or None if nothing did"""
+        if self._dirty_lo is None:
+            return None
+
+        self.version += 1
+        patch = {
+            "version": self.version,
+            "base_version": self.version - 1,
+            "epoch": self.epoch,
+            "changed": self._rows(self._dirty_lo, self._dirty_hi + 1),
+            "removed": sorted(self._removed),
+            "total": len(self.keys)
+        }
+        self._dirty_lo = self._dirty_hi = None
+        self._removed = set()
+        self.patches.append(patch)
+        return patch
+
+
+# Global leaderboard index instance
+leaderboard_index = LeaderboardIndex(settings.LEADERBOARD_PATCH_RING_SIZE)
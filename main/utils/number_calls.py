@@ -0,0 +1,181 @@
+"""Pre-rendered Housie number calls ("two and six, twenty-six").
+
+Every call is synthesized once, at startup or ahead of time with
+`python -m main.utils.number_calls`, into static/tts/calls under a
+content-hashed name. Draws only look up a URL, and the clips are served
+with immutable caching.
+"""
+from pathlib import Path
+from typing import Dict, Optional
+import asyncio
+import hashlib
+import shutil
+import subprocess
+import tempfile
+
+from .config import settings, BASE_DIR
+from .static_files import compress_variants, write_atomic
+
+CALLS_DIR = BASE_DIR / "static" / "tts" / "calls"
+CALLS_URL_PREFIX = "/static/tts/calls/"
+
+ONES = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine",
+        "ten", "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen",
+        "seventeen", "eighteen", "nineteen"]
+TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+
+
+def number_words(number: int) -> str:
+    if number < 20:
+        return ONES[number]
+    tens, ones = divmod(number, 10)
+    return TENS[tens] + (f"-{ONES[ones]}" if ones else "")
+
+
+def call_phrase(number: int) -> str:
+    """What the caller says for a number: "two and six, twenty-six" """
+    if number < 10:
+        return f"single number, {ONES[number]}"
+    tens, ones = divmod(number, 10)
+    return f"{ONES[tens]} and {ONES[ones]}, {number_words(number)}"
+
+
+class TTSEngine:
+    """Renders a phrase to a WAV file"""
+
+    name = "none"
+
+    def available(self) -> bool:
+        return False
+
+    def render(self, text: str, path: Path):
+        raise NotImplementedError
+
+
+class EspeakEngine(TTSEngine):
+    name = "espeak"
+
+    def __init__(self):
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self) -> bool:
+        return self.binary is not None
+
+    def render(self, text: str, path: Path):
+        subprocess.run(
+            [self.binary, "-v", settings.TTS_VOICE, "-s", str(settings.TTS_RATE), "-w", str(path), text],
+            check=True, capture_output=True, timeout=30
+        )
+
+
+class Pyttsx3Engine(TTSEngine):
+    name = "pyttsx3"
+
+    def available(self) -> bool:
+        try:
+            import pyttsx3  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def render(self, text: str, path: Path):
+        import pyttsx3
+        engine = pyttsx3.init()
+        engine.setProperty("rate", settings.TTS_RATE)
+        engine.save_to_file(text, str(path))
+        engine.runAndWait()
+        engine.stop()
+
+
+ENGINES = {engine.name: engine for engine in (EspeakEngine, Pyttsx3Engine)}
+
+
+def select_engine(name: str) -> Optional[TTSEngine]:
+    """The configured engine, or the first available one for "auto" """
+    candidates = list(ENGINES) if name == "auto" else [name]
+    for candidate in candidates:
+        engine_class = ENGINES.get(candidate)
+        if engine_class is None:
+            continue
+        engine = engine_class()
+        if engine.available():
+            return engine
+    return None
+
+
+class NumberCallCache:
+    """The 90 rendered number calls, keyed by number"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.urls: Dict[int, str] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    def url(self, number: int) -> Optional[str]:
+        """URL of a number's call, or None while it isn't rendered"""
+        return self.urls.get(number)
+
+    def prepare(self) -> int:
+        """Render every call that is missing from the cache; returns how many are available"""
+        engine = select_engine(settings.TTS_ENGINE)
+        if engine is None:
+            if settings.TTS_ENGINE != "none":
+                print("No text-to-speech engine available (install espeak-ng or pyttsx3); number calls are silent")
+            return 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        encoder = shutil.which("ffmpeg")
+        suffix = ".ogg" if encoder else ".wav"
+        for number in range(1, 91):
+            phrase = call_phrase(number)
+            # Name by everything that shapes the audio, so changing the voice re-renders
+            key = "|".join([engine.name, settings.TTS_VOICE, str(settings.TTS_RATE), suffix, phrase])
+            name = f"{number}.{hashlib.sha256(key.encode()).hexdigest()[:12]}{suffix}"
+            if not (self.directory / name).exists():
+                try:
+                    self._render(engine, encoder, phrase, name)
+                except Exception as e:
+                    print(f"Error rendering number call {number}: {e}")
+                    continue
+            self.urls[number] = CALLS_URL_PREFIX + name
+        print(f"Number calls ready ({len(self.urls)} clips, {engine.name})")
+        return len(self.urls)
+
+    def _render(self, engine: TTSEngine, encoder: Optional[str], phrase: str, name: str):
+        with tempfile.TemporaryDirectory() as tmp:
+            wav = Path(tmp) / "call.wav"
+            engine.render(phrase, wav)
+            if encoder:
+                # Opus at speech bitrate is a fraction of the size of the raw WAV
+                output = Path(tmp) / "call.ogg"
+                subprocess.run(
+                    [encoder, "-y", "-loglevel", "error", "-i", str(wav), "-ac", "1",
+                     "-c:a", "libopus", "-b:a", "24k", str(output)],
+                    check=True, capture_output=True, timeout=30
+                )
+            else:
+                output = wav
+            data = output.read_bytes()
+
+        outputs = {self.directory / name: data}
+        if not encoder:
+            # Raw WAV still shrinks with gzip/brotli, served by Accept-Encoding
+            for variant, encoded in compress_variants(data).items():
+                if len(encoded) < len(data):
+                    outputs[self.directory / (name + variant)] = encoded
+        # Variants first, so the plain file only appears once the set is complete
+        for path, content in sorted(outputs.items(), key=lambda item: item[0].name == name):
+            write_atomic(path, content)
+
+    def prepare_in_background(self):
+        """Render missing calls in a worker thread so startup isn't held up"""
+        if self.task is None:
+            self.task = asyncio.create_task(asyncio.to_thread(self.prepare))
+
+
+# Global number call cache instance
+number_calls = NumberCallCache(CALLS_DIR)
+
+
+if __name__ == "__main__":
+    number_calls.prepare()
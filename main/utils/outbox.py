@@ -0,0 +1,143 @@
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from functools import partial
+from typing import Awaitable, Callable, Optional, Set
+import asyncio
+import json
+import time
+
+from .config import settings
+from .db import AsyncSessionLocal, OutboxEvent
+from .broadcast_backend import broadcast_backend
+
+Deliver = Callable[[], Awaitable[None]]
+
+
+class OutboxPublisher:
+    """Transactional outbox: state-change events are written in the same transaction
+    as the change and published to the other workers by a background task, so
+    handlers never wait on a broadcast and a committed change is never left
+    unannounced.
+
+    Local clients are updated straight after commit (dispatch), independently of
+    the queue. The queue publishes each event to the other workers at least once,
+    in commit order, retrying with backoff. Events left behind by a worker that
+    died are claimed once they are OUTBOX_STALE_AFTER seconds old and applied
+    here as well as published.
+
+    Events can therefore arrive late, and a recovered one may be older than the
+    state this worker loaded at startup. Handlers on outbox channels take the
+    payload as a notice of what changed and re-read that state from the
+    database; they never replay it.
+    """
+
+    def __init__(self):
+        # Claimed events from a dead worker, still to be applied locally
+        self.recovered: Set[int] = set()
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.swept_at = 0.0
+
+    def add(self, db: AsyncSession, channel: str, data: dict) -> OutboxEvent:
+        """Record an event in the caller's transaction; call dispatch() once it has committed"""
+        event = OutboxEvent(
+            channel=channel,
+            payload=json.dumps(data),
+            owner=broadcast_backend.worker_id,
+            created_at=time.time()
+        )
+        db.add(event)
+        return event
+
+    def dispatch(self, event: OutboxEvent, deliver: Optional[Deliver] = None):
+        """A committed event: update local clients now and queue it for the other workers"""
+        if deliver:
+            asyncio.create_task(self._deliver(event.channel, deliver))
+        self.wakeup.set()
+
+    async def _deliver(self, channel: str, deliver: Deliver):
+        try:
+            await deliver()
+        except Exception as e:
+            print(f"Error delivering {channel} event locally: {e}")
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+
+    async def _run(self):
+        delay = settings.OUTBOX_RETRY_DELAY
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=settings.OUTBOX_STALE_AFTER)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                if time.time() - self.swept_at >= settings.OUTBOX_STALE_AFTER:
+                    await self._claim_stale()
+                while await self._publish_batch():
+                    pass
+            except Exception as e:
+                print(f"Error publishing outbox events, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.OUTBOX_RETRY_MAX_DELAY)
+                self.wakeup.set()
+            else:
+                delay = settings.OUTBOX_RETRY_DELAY
+
+    async def _claim_stale(self):
+        """Take over events another worker committed but never published"""
+        self.swept_at = time.time()
+        stale = (OutboxEvent.owner != broadcast_backend.worker_id,
+                 OutboxEvent.created_at < self.swept_at - settings.OUTBOX_STALE_AFTER)
+        async with AsyncSessionLocal() as db:
+            ids = (await db.execute(select(OutboxEvent.id).where(*stale))).scalars().all()
+            if not ids:
+                return
+            await db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(ids), *stale)
+                .values(owner=broadcast_backend.worker_id)
+            )
+            await db.commit()
+            # Only the ones we won; another worker may have claimed some first
+            claimed = (await db.execute(
+                select(OutboxEvent.id).where(OutboxEvent.id.in_(ids), OutboxEvent.owner == broadcast_backend.worker_id)
+            )).scalars().all()
+        self.recovered.update(claimed)
+        if claimed:
+            print(f"Claimed {len(claimed)} unpublished outbox events")
+
+    async def _publish_batch(self) -> bool:
+        """Publish our pending events in order; returns True if there may be more"""
+        async with AsyncSessionLocal() as db:
+            events = (await db.execute(
+                select(OutboxEvent)
+                .where(OutboxEvent.owner == broadcast_backend.worker_id)
+                .order_by(OutboxEvent.id)
+                .limit(settings.OUTBOX_BATCH_SIZE)
+            )).scalars().all()
+
+            for event in events:
+                data = json.loads(event.payload)
+                if event.id in self.recovered:
+                    # Nobody has seen it yet, this worker included; the handler
+                    # re-reads the database, so an old payload can't roll state back
+                    self.recovered.discard(event.id)
+                    handler = broadcast_backend.handlers.get(event.channel)
+                    if handler:
+                        await self._deliver(event.channel, partial(handler, data))
+                await broadcast_backend.publish(event.channel, data)
+                await db.execute(delete(OutboxEvent).where(OutboxEvent.id == event.id))
+                await db.commit()
+
+        return len(events) == settings.OUTBOX_BATCH_SIZE
+
+
+# Global outbox publisher instance
+outbox = OutboxPublisher()
@@ -0,0 +1,69 @@
+from fastapi.responses import JSONResponse
+from typing import Any, Callable, Dict, Hashable, Tuple
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON; orjson is optional"""
+    if orjson is not None:
+        # Integer keys become strings, as with json.dumps
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def message(message_type: str, body: bytes) -> str:
+    """A WebSocket message wrapping an already serialized payload"""
+    return '{"type":' + json.dumps(message_type) + ',"data":' + body.decode() + "}"
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: JSONResponse rendered with the faster encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EncodedCache:
+    """Serialized copies of read-mostly payloads, keyed by the version of the state they show.
+
+    Each version is encoded once and the bytes are shared by the HTTP responses
+    and the WebSocket messages built from them.
+    """
+
+    def __init__(self):
+        # name -> (version, body, {message type: message})
+        self.entries: Dict[str, Tuple[Hashable, bytes, Dict[str, str]]] = {}
+
+    def body(self, name: str, version: Hashable, build: Callable[[], Any]) -> bytes:
+        """The payload's bytes at `version`, built and encoded only on the first request"""
+        entry = self.entries.get(name)
+        if entry is None or entry[0] != version:
+            entry = (version, dumps(build()), {})
+            self.entries[name] = entry
+        return entry[1]
+
+    def message(self, name: str, version: Hashable, build: Callable[[], Any], message_type: str) -> str:
+        """The payload at `version` wrapped as a WebSocket message of `message_type`"""
+        body = self.body(name, version, build)
+        messages = self.entries[name][2]
+        if message_type not in messages:
+            messages[message_type] = message(message_type, body)
+        return messages[message_type]
+
+    async def body_async(self, name: str, version: Hashable, build: Callable[[], Any]) -> bytes:
+        """Like body(), for payloads that are loaded from the database"""
+        entry = self.entries.get(name)
+        if entry is None or entry[0] != version:
+            data = await build()
+            entry = (version, dumps(data), {})
+            self.entries[name] = entry
+        return entry[1]
+
+
+# Global encoded payload cache instance
+encoded_cache = EncodedCache()
@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from types import SimpleNamespace
+from typing import Optional
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+from .config import settings
+from .db import User
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(settings.SECRET_KEY.encode(), payload.encode(), hashlib.sha256).digest())
+
+
+def create_session_token(user: User) -> str:
+    """Signed, self-describing session token: base64(json claims) + "." + HMAC-SHA256"""
+    claims = {"uid": user.user_id, "usr": user.username, "role": user.role, "iat": int(time.time())}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def read_session_token(token: Optional[str]) -> Optional[dict]:
+    """Claims of a valid, unexpired token, or None"""
+    if not token or "." not in token:
+        return None
+    payload, signature = token.rsplit(".", 1)
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get("iat", 0) + settings.SESSION_MAX_AGE < time.time():
+        return None
+    return claims
+
+
+class UserCache:
+    """LRU cache of user records with a TTL, so page loads don't need a DB hit"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        # user_id -> (expires_at, record), least recently used first
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+
+    def get(self, user_id: int) -> Optional[SimpleNamespace]:
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, record = entry
+        if expires_at < time.monotonic():
+            del self.entries[user_id]
+            return None
+        self.entries.move_to_end(user_id)
+        return record
+
+    def put(self, user: User) -> SimpleNamespace:
+        """Cache a detached copy of a user and return it"""
+        record = SimpleNamespace(
+            user_id=user.user_id,
+            username=user.username,
+            real_name=user.real_name,
+            gender=user.gender,
+            role=user.role,
+            profile_photo=user.profile_photo,
+            points=user.points,
+            is_deleted=user.is_deleted
+        )
+        self.entries[user.user_id] = (time.monotonic() + self.ttl, record)
+        self.entries.move_to_end(user.user_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return record
+
+    def invalidate(self, user_id: int):
+        self.entries.pop(user_id, None)
+
+
+async def get_session_user(request: Request, db: AsyncSession) -> Optional[SimpleNamespace]:
+    """User behind the request's session_token cookie; only touches the DB on a cache miss"""
+    claims = read_session_token(request.cookies.get("session_token"))
+    if not claims:
+        return None
+
+    user = user_cache.get(claims["uid"])
+    if user is None:
+        db_user = await db.get(User, claims["uid"])
+        if not db_user:
+            return None
+        user = user_cache.put(db_user)
+
+    # A token only ever belongs to the account it was issued for
+    if user.username != claims["usr"]:
+        return None
+    return user
+
+
+# Global user cache instance
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
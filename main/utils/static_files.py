@@ -0,0 +1,150 @@
+from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException
+from pathlib import Path
+import gzip
+import hashlib
+import mimetypes
+import os
+import tempfile
+
+from .config import BASE_DIR
+
+# Content-addressed files never change, so browsers may cache them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+STATIC_DIR = BASE_DIR / "static"
+ASSET_DIST_DIR = STATIC_DIR / "dist"
+ASSET_URL_PREFIX = "/static/dist/"
+# Source folders that get fingerprinted (avatars are content-addressed already)
+ASSET_SOURCE_DIRS = ("css", "js", "images")
+# Text formats worth precompressing; PNGs are compressed already
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".html", ".json", ".txt"}
+# Precompressed variants in order of preference: (encoding, file suffix)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def compress_variants(data: bytes) -> dict:
+    """Encoded copies of a file; brotli is optional"""
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        return variants
+    variants[".br"] = brotli.compress(data, quality=11)
+    return variants
+
+
+def write_atomic(path: Path, data: bytes):
+    """Write through a unique temp file in the same folder, then rename into place.
+
+    Readers never see a half-written file, and concurrent writers (other
+    workers, threads) each get their own temp file instead of sharing one.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class AssetManifest:
+    """Maps source asset paths (e.g. "css/style.css") to fingerprinted copies in static/dist"""
+
+    def __init__(self, source_dir: Path, dist_dir: Path):
+        self.source_dir = source_dir
+        self.dist_dir = dist_dir
+        self.dist_dir.mkdir(parents=True, exist_ok=True)
+        self.files = {}
+
+    def build(self):
+        """Fingerprint every source asset and write its precompressed variants (unchanged files are skipped)"""
+        files = {}
+        for folder in ASSET_SOURCE_DIRS:
+            for path in sorted((self.source_dir / folder).rglob("*")):
+                if not path.is_file():
+                    continue
+                source = path.relative_to(self.source_dir).as_posix()
+                files[source] = self._write(source, path.read_bytes())
+        self.files = files
+        print(f"Static assets fingerprinted ({len(files)} files)")
+
+    def _write(self, source: str, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        path = Path(source)
+        target = path.with_name(f"{path.stem}.{digest}{path.suffix}").as_posix()
+        output = self.dist_dir / target
+        if output.exists():
+            return target
+
+        outputs = {output: data}
+        if path.suffix in COMPRESSIBLE_SUFFIXES:
+            for suffix, encoded in compress_variants(data).items():
+                # Only keep variants that are actually smaller
+                if len(encoded) < len(data):
+                    outputs[output.with_name(output.name + suffix)] = encoded
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        # Variants first, so the plain file only appears once the set is complete
+        for file_path, content in sorted(outputs.items(), key=lambda item: item[0] == output):
+            write_atomic(file_path, content)
+        return target
+
+    def url(self, source: str) -> str:
+        """URL of the fingerprinted asset, or the plain static URL if it wasn't built"""
+        source = source.lstrip("/")
+        target = self.files.get(source)
+        if target is None:
+            return f"/static/{source}"
+        return ASSET_URL_PREFIX + target
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for content-addressed assets, served with long-lived cache headers"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+class PrecompressedStaticFiles(ImmutableStaticFiles):
+    """Serves the .br/.gz variant of a file when the client accepts it"""
+
+    async def get_response(self, path: str, scope):
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        accepted = {token.split(";")[0].strip().lower() for token in accept_encoding.split(",")}
+
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                response = await super().get_response(path + suffix, scope)
+            except HTTPException:
+                continue
+            if response.status_code == 404:
+                continue
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            if media_type.startswith("text/"):
+                media_type += "; charset=utf-8"
+            response.headers["Content-Type"] = media_type
+            response.headers["Content-Encoding"] = encoding
+            response.headers["Vary"] = "Accept-Encoding"
+            return response
+
+        response = await super().get_response(path, scope)
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+# Global asset manifest instance
+asset_manifest = AssetManifest(STATIC_DIR, ASSET_DIST_DIR)
@@ -0,0 +1,67 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Tuple
+import asyncio
+import hashlib
+import json
+
+from .cipher import encode
+from .db import TreasureHunt
+
+
+class TreasureClueCache:
+    """The current treasure hunt clue, encrypted once and kept in memory until it is solved or edited"""
+
+    def __init__(self):
+        self.payload: Optional[dict] = None
+        self.etag: Optional[str] = None
+        # Bumped on every invalidation so a load that raced with one is not kept
+        self.generation = 0
+        self.lock = asyncio.Lock()
+
+    async def get(self, db: AsyncSession) -> Tuple[dict, str]:
+        """Current clue payload and its ETag, loading it from the DB only after an invalidation"""
+        if self.payload is None:
+            async with self.lock:
+                if self.payload is None:
+                    return await self._load(db)
+        return self.payload, self.etag
+
+    def invalidate(self):
+        self.generation += 1
+        self.payload = None
+        self.etag = None
+
+    async def _load(self, db: AsyncSession) -> Tuple[dict, str]:
+        generation = self.generation
+        # Find the next unanswered treasure hunt (answered_by = 0)
+        treasure = (await db.execute(
+            select(TreasureHunt).where(TreasureHunt.answered_by == 0).order_by(TreasureHunt.id).limit(1)
+        )).scalars().first()
+
+        if not treasure:
+            payload = {
+                "treasure": None,
+                "message": "No more treasure hunts available!"
+            }
+        else:
+            payload = {
+                "treasure": {
+                    "id": treasure.id,
+                    "hint": treasure.hint,
+                    "encrypted_hint": encode(treasure.hint),
+                    "is_answered": False
+                }
+            }
+
+        body = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        etag = '"' + hashlib.sha256(body.encode()).hexdigest()[:16] + '"'
+        # Keep it unless it was invalidated while we were reading
+        if generation == self.generation:
+            self.payload = payload
+            self.etag = etag
+        return payload, etag
+
+
+# Global treasure clue cache instance
+treasure_clue = TreasureClueCache()
@@ -0,0 +1,127 @@
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, List, Optional, Tuple
+import asyncio
+
+from .db import AsyncSessionLocal, OutboxEvent, TreasureHunt, User
+
+# Points for solving a clue
+TREASURE_POINTS = 10
+
+
+def normalize_answer(answer: str) -> str:
+    """Remove hyphens/underscores and make case-insensitive"""
+    return answer.strip().replace("-", "").replace("_", "").upper()
+
+
+class TreasureJudge:
+    """Judges answers one at a time against the current clue held in memory.
+
+    A single worker task drains the submission queue, so only one correct
+    answer per clue can ever reach the DB from this process; the conditional
+    UPDATE guards against other workers. Wrong answers never touch the DB.
+    """
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+        # (treasure id, normalized answer) of the current clue; None means "load it"
+        self.current: Optional[Tuple[int, str]] = None
+        self.loaded = False
+        # Records a win's outbox events in the winning transaction; returns them for dispatch
+        self.stage_win: Optional[Callable[[AsyncSession, User], List[OutboxEvent]]] = None
+
+    async def submit(self, user_id: int, answer: str) -> Tuple[dict, Optional[User], List[OutboxEvent]]:
+        """Queue an answer and wait for its verdict: (response, winning user or None, outbox events to dispatch)"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((user_id, normalize_answer(answer), future))
+        return await future
+
+    def invalidate(self):
+        """Reload the current clue before the next verdict (it was solved or edited elsewhere)"""
+        self.loaded = False
+
+    async def _run(self):
+        while True:
+            user_id, answer, future = await self.queue.get()
+            try:
+                verdict = await self._judge(user_id, answer)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(verdict)
+
+    async def _load(self):
+        async with AsyncSessionLocal() as db:
+            # Find the next unanswered treasure hunt (answered_by = 0)
+            treasure = (await db.execute(
+                select(TreasureHunt).where(TreasureHunt.answered_by == 0).order_by(TreasureHunt.id).limit(1)
+            )).scalars().first()
+        self.current = (treasure.id, normalize_answer(treasure.answer)) if treasure else None
+        self.loaded = True
+
+    async def _judge(self, user_id: int, answer: str) -> Tuple[dict, Optional[User], List[OutboxEvent]]:
+        if not self.loaded:
+            await self._load()
+        if self.current is None:
+            return {
+                "message": "No more treasure hunts available!",
+                "is_correct": False,
+                "treasure_id": None
+            }, None, []
+
+        treasure_id, expected = self.current
+        if answer != expected:
+            return {
+                "message": "Incorrect answer. Try again!",
+                "is_correct": False,
+                "treasure_id": treasure_id
+            }, None, []
+
+        staged = []
+        async with AsyncSessionLocal() as db:
+            # Only the first solver flips answered_by; the points go in the same transaction
+            claimed = await db.execute(
+                update(TreasureHunt)
+                .where(TreasureHunt.id == treasure_id, TreasureHunt.answered_by == 0)
+                .values(answered_by=user_id)
+            )
+            if claimed.rowcount != 1:
+                await db.rollback()
+                winner = None
+            else:
+                awarded = await db.execute(
+                    update(User).where(User.user_id == user_id).values(points=User.points + TREASURE_POINTS)
+                )
+                if awarded.rowcount != 1:
+                    await db.rollback()
+                    raise LookupError("User not found")
+                # Read back the new total before committing, so the announcement commits with it
+                winner = await db.get(User, user_id)
+                if self.stage_win:
+                    staged = self.stage_win(db, winner)
+                await db.commit()
+
+        # Either way this clue is finished; move on to the next one
+        await self._load()
+        if winner is None:
+            return {
+                "message": "Someone else solved this clue first. Try the next one!",
+                "is_correct": False,
+                "treasure_id": treasure_id
+            }, None, []
+
+        return {
+            "message": f"Correct answer! You earned {TREASURE_POINTS} points!",
+            "is_correct": True,
+            "treasure_id": treasure_id,
+            "points_awarded": TREASURE_POINTS
+        }, winner, staged
+
+
+# Global treasure judge instance
+treasure_judge = TreasureJudge()
@@ -0,0 +1,64 @@
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Sequence
+import base64
+import binascii
+
+from .db import User
+
+# Columns a client may ask for with ?fields=; user_id is always included
+USER_FIELDS = ("user_id", "username", "real_name", "gender", "profile_photo", "points", "role", "is_deleted")
+
+
+def encode_cursor(username: str) -> str:
+    """Opaque cursor pointing just after a username"""
+    return base64.urlsafe_b64encode(username.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_fields(fields: Optional[str], default: Sequence[str]) -> List[str]:
+    """Requested columns in USER_FIELDS order, or the default set"""
+    if not fields:
+        return list(default)
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(USER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [field for field in USER_FIELDS if field in requested or field == "user_id"]
+
+
+def escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def fetch_user_page(db: AsyncSession, fields: Sequence[str], limit: int, cursor: Optional[str] = None,
+                          search: Optional[str] = None, players_only: bool = False) -> dict:
+    """One page of users ordered by username, using the username as the keyset cursor.
+
+    Each page is an index range scan from the cursor, so its cost doesn't grow
+    with the number of users before it. Search matches username or real name
+    prefixes, which the username and real_name indexes can serve.
+    """
+    # The cursor needs the username even when the client didn't ask for it
+    columns = list(fields) if "username" in fields else list(fields) + ["username"]
+    query = select(*[getattr(User, column) for column in columns])
+    if players_only:
+        query = query.where(User.role != "admin", User.is_deleted == 0)
+    if search:
+        pattern = escape_like(search) + "%"
+        query = query.where(or_(User.username.like(pattern, escape="\\"), User.real_name.like(pattern, escape="\\")))
+    if cursor:
+        query = query.where(User.username > decode_cursor(cursor))
+    # One extra row tells us whether there is another page
+    query = query.order_by(User.username).limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    users = [dict(zip(fields, row)) for row in rows[:limit]]
+    next_cursor = encode_cursor(rows[limit - 1].username) if len(rows) > limit else None
+    return {"users": users, "next_cursor": next_cursor}
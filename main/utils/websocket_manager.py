@@ -1,113 +1,253 @@
 from fastapi import WebSocket
-from typing import List
-import json
+from typing import Dict, Iterable, Optional, Set
+from collections import deque
 import asyncio
+import time
+
+from .config import settings
+from .serialization import dumps
+
+
+class ClientConnection:
+    """Bounded outgoing queue plus a dedicated writer task for one WebSocket"""
+
+    def __init__(self, websocket: WebSocket, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.manager = manager
+        # Each entry is [coalesce_key, message] so coalescing can replace in place
+        self.queue = deque()
+        self.max_queue = settings.WS_SEND_QUEUE_SIZE
+        self.policy = settings.WS_SLOW_CONSUMER_POLICY
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        self.dropped = 0
+        # Topics this connection is subscribed to
+        self.topics: Set[str] = set()
+        self.ip = websocket.client.host if websocket.client else None
+        # Monotonic time of the last message received from the client
+        self.last_seen = time.monotonic()
+        self.task = asyncio.create_task(self._writer())
+
+    def enqueue(self, message: str, coalesce_key: Optional[str] = None) -> bool:
+        """Queue a message without blocking. Returns False if the client should be dropped."""
+        if self.closed:
+            return False
+
+        if coalesce_key is not None and self.policy == "coalesce":
+            # A newer message of the same kind supersedes the one still waiting
+            for entry in self.queue:
+                if entry[0] == coalesce_key:
+                    entry[1] = message
+                    return True
+
+        if len(self.queue) >= self.max_queue:
+            if self.policy == "disconnect":
+                return False
+            # Drop the oldest pending message to make room
+            self.queue.popleft()
+            self.dropped += 1
+
+        self.queue.append([coalesce_key, message])
+        self.wakeup.set()
+        return True
+
+    async def _writer(self):
+        """Drain the queue onto the socket, one message at a time"""
+        try:
+            while not self.closed:
+                if not self.queue:
+                    self.wakeup.clear()
+                    await self.wakeup.wait()
+                    continue
+                _, message = self.queue.popleft()
+                await asyncio.wait_for(self.websocket.send_text(message), timeout=settings.WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Error sending to WebSocket connection: {e}")
+            self.manager.disconnect(self.websocket)
+
+    def close(self):
+        """Stop the writer task and discard anything still queued"""
+        self.closed = True
+        self.queue.clear()
+        if self.task is not asyncio.current_task():
+            self.task.cancel()
+
+
+# Topics a client can subscribe to on /ws
+TOPICS = ("board", "leaderboard", "treasure", "admin")
+# Close code telling the browser to try again later
+WS_TRY_AGAIN_LATER = 1013
+# Close code for connections reaped as idle
+WS_GOING_AWAY = 1001
+
 
 class ConnectionManager:
     def __init__(self):
-        # Store active connections
-        self.active_connections: List[WebSocket] = []
-        # Store leaderboard connections separately
-        self.leaderboard_connections: List[WebSocket] = []
-        # Store board connections separately  
-        self.board_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket, connection_type: str = "general"):
-        """Accept a WebSocket connection"""
+        # Outgoing queue and writer task per connection
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        # Subscribers per topic; sets make subscribe/unsubscribe/disconnect O(1)
+        self.topics: Dict[str, Set[WebSocket]] = {topic: set() for topic in TOPICS}
+        # Open connections per client IP
+        self.per_ip: Dict[Optional[str], int] = {}
+        self.heartbeat_task: Optional[asyncio.Task] = None
+
+    async def connect(self, websocket: WebSocket, topics: Iterable[str] = ()) -> bool:
+        """Accept a WebSocket connection; returns False if it was refused by a connection cap"""
+        ip = websocket.client.host if websocket.client else None
+        if len(self.clients) >= settings.WS_MAX_CONNECTIONS or self.per_ip.get(ip, 0) >= settings.WS_MAX_CONNECTIONS_PER_IP:
+            print(f"Refusing WebSocket connection from {ip}: connection limit reached")
+            await websocket.close(code=WS_TRY_AGAIN_LATER)
+            return False
+
         await websocket.accept()
-        self.active_connections.append(websocket)
-        
-        if connection_type == "leaderboard":
-            self.leaderboard_connections.append(websocket)
-        elif connection_type == "board":
-            self.board_connections.append(websocket)
-            
-        print(f"WebSocket connected. Total connections: {len(self.active_connections)}")
+        self.clients[websocket] = ClientConnection(websocket, self)
+        self.per_ip[ip] = self.per_ip.get(ip, 0) + 1
+        self.subscribe(websocket, topics)
+        if self.heartbeat_task is None or self.heartbeat_task.done():
+            self.heartbeat_task = asyncio.create_task(self._heartbeat())
+        print(f"WebSocket connected. Total connections: {len(self.clients)}")
+        return True
+
+    def touch(self, websocket: WebSocket):
+        """Record that the client is alive (any inbound message counts)"""
+        client = self.clients.get(websocket)
+        if client:
+            client.last_seen = time.monotonic()
 
-    def disconnect(self, websocket: WebSocket, connection_type: str = "general"):
+    async def _heartbeat(self):
+        """Ping every client on an interval and reap the ones that stopped answering"""
+        ping = dumps({"type": "ping"}).decode()
+        while self.clients:
+            await asyncio.sleep(settings.WS_PING_INTERVAL)
+            deadline = time.monotonic() - settings.WS_PING_INTERVAL - settings.WS_PING_TIMEOUT
+            idle = [websocket for websocket, client in self.clients.items() if client.last_seen < deadline]
+            for websocket in idle:
+                print("Reaping idle WebSocket connection")
+                self.disconnect(websocket)
+                asyncio.create_task(self._close_quietly(websocket))
+            self._fan_out(list(self.clients), ping, "ping")
+
+    async def _close_quietly(self, websocket: WebSocket):
+        # A half-open socket may never finish the close handshake
+        try:
+            await asyncio.wait_for(websocket.close(code=WS_GOING_AWAY), timeout=settings.WS_SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    async def stop(self):
+        """Stop the heartbeat (on shutdown)"""
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]) -> Set[str]:
+        """Add a connection to topics; returns the ones it wasn't subscribed to yet"""
+        client = self.clients.get(websocket)
+        if client is None:
+            return set()
+        added = {topic for topic in topics if topic in self.topics} - client.topics
+        for topic in added:
+            self.topics[topic].add(websocket)
+        client.topics |= added
+        return added
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]):
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        for topic in set(topics) & client.topics:
+            self.topics[topic].discard(websocket)
+            client.topics.discard(topic)
+
+    def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if websocket in self.leaderboard_connections:
-            self.leaderboard_connections.remove(websocket)
-        if websocket in self.board_connections:
-            self.board_connections.remove(websocket)
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        for topic in client.topics:
+            self.topics[topic].discard(websocket)
+        self.per_ip[client.ip] -= 1
+        if not self.per_ip[client.ip]:
+            del self.per_ip[client.ip]
+        client.close()
             
-        print(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
+        print(f"WebSocket disconnected. Total connections: {len(self.clients)}")
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        """Send message to a specific WebSocket"""
-        try:
-            await websocket.send_text(message)
-        except Exception as e:
-            print(f"Error sending personal message: {e}")
+        """Queue a message for a specific WebSocket"""
+        client = self.clients.get(websocket)
+        if client and not client.enqueue(message):
+            print("Dropping slow WebSocket connection")
             self.disconnect(websocket)
 
-    async def broadcast_leaderboard(self, data: dict):
-        """Broadcast leaderboard updates to all leaderboard connections"""
-        if not self.leaderboard_connections:
+    def _fan_out(self, connections: Iterable[WebSocket], message: str, coalesce_key: Optional[str] = None):
+        """Enqueue a message on every connection without waiting for any send"""
+        slow = []
+        for connection in connections:
+            client = self.clients.get(connection)
+            if client and not client.enqueue(message, coalesce_key):
+                slow.append(connection)
+
+        # Remove connections that could not keep up
+        for conn in slow:
+            print("Dropping slow WebSocket connection")
+            self.disconnect(conn)
+
+    def _publish(self, topic: str, message_type: str, data, coalesce_key: Optional[str] = None):
+        """Serialize once and fan out to a topic's subscribers"""
+        subscribers = self.topics[topic]
+        if not subscribers:
             return
-            
-        message = json.dumps({
-            "type": "leaderboard_update",
-            "data": data
-        })
-        
-        # Send to all leaderboard connections
-        disconnected = []
-        for connection in self.leaderboard_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                print(f"Error broadcasting to leaderboard connection: {e}")
-                disconnected.append(connection)
-        
-        # Remove disconnected connections
-        for conn in disconnected:
-            self.disconnect(conn, "leaderboard")
+        message = dumps({"type": message_type, "data": data}).decode()
+        self._fan_out(subscribers, message, coalesce_key)
+
+    async def broadcast_leaderboard(self, data: dict):
+        """Broadcast leaderboard updates to all leaderboard subscribers"""
+        # Full leaderboard snapshots supersede each other, so they can be coalesced
+        self._publish("leaderboard", "leaderboard_update", data, "leaderboard_update")
+
+    async def broadcast_leaderboard_patch(self, patch: dict):
+        """Broadcast only the changed leaderboard rows to all leaderboard subscribers"""
+        # Patches build on each other; a client that misses one resyncs by version
+        self._publish("leaderboard", "leaderboard_patch", patch)
 
     async def broadcast_board(self, data: dict):
-        """Broadcast board updates to all board connections"""
-        if not self.board_connections:
-            return
-            
-        message = json.dumps({
-            "type": "board_update", 
-            "data": data
-        })
-        
-        # Send to all board connections
-        disconnected = []
-        for connection in self.board_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                print(f"Error broadcasting to board connection: {e}")
-                disconnected.append(connection)
-        
-        # Remove disconnected connections
-        for conn in disconnected:
-            self.disconnect(conn, "board")
+        """Broadcast board updates to all board subscribers"""
+        self._publish("board", "board_update", data, "board_update")
+
+    async def broadcast_board_event(self, event: dict):
+        """Broadcast a single sequenced board event to all board subscribers"""
+        # Events are deltas, so they must never be coalesced away
+        self._publish("board", "board_event", event)
+
+    async def broadcast_board_events(self, events: list):
+        """Broadcast a batch of sequenced board events as a single message"""
+        if events:
+            self._publish("board", "board_events", {"events": events})
+
+    async def broadcast_auto_draw(self, data: dict):
+        """Broadcast the auto-draw schedule status to all board subscribers"""
+        # Only the latest status matters
+        self._publish("board", "auto_draw_status", data, "auto_draw_status")
+
+    async def broadcast_treasure(self, data: dict):
+        """Broadcast the current treasure hunt clue to all treasure subscribers"""
+        # Only the latest clue matters
+        self._publish("treasure", "treasure_update", data, "treasure_update")
+
+    async def broadcast_admin(self, message_type: str, data: dict):
+        """Broadcast an admin-only message (e.g. job progress) to admin subscribers"""
+        self._publish("admin", message_type, data)
 
     async def broadcast_to_all(self, data: dict):
         """Broadcast to all active connections"""
-        if not self.active_connections:
+        if not self.clients:
             return
             
-        message = json.dumps(data)
-        
-        # Send to all connections
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                print(f"Error broadcasting to connection: {e}")
-                disconnected.append(connection)
+        message = dumps(data).decode()
         
-        # Remove disconnected connections
-        for conn in disconnected:
-            self.disconnect(conn)
+        self._fan_out(list(self.clients), message)
 
 # Global connection manager instance
 manager = ConnectionManager()
@@ -1,19 +1,44 @@
 // Live WebSocket Manager for Fun Thursday
+const PATTERN_LABELS = {
+    early_five: 'Early Five',
+    top_line: 'Top Line',
+    middle_line: 'Middle Line',
+    bottom_line: 'Bottom Line',
+    full_house: 'Full House'
+};
+
 class LiveWebSocketManager {
     constructor() {
-        this.leaderboardWs = null;
-        this.boardWs = null;
+        this.ws = null; // Single multiplexed connection
         this.reconnectAttempts = 0;
         this.maxReconnectAttempts = 5;
         this.reconnectDelay = 1000;
         this.imageCache = new Map(); // Cache for loaded images
         this.updateTimeout = null; // For debouncing updates
+        this.boardSeq = null; // Last board event sequence number applied
+        this.boardEpoch = null; // Server run the sequence number belongs to
+        this.drawnNumbers = [];
+        this.leaderboardRows = []; // Current ranking, index = rank - 1
+        this.leaderboardVersion = null; // Version of the last snapshot/patch applied
+        this.leaderboardEpoch = null; // Server run the version belongs to
+        this.tickets = []; // This player's Housie tickets (3x9 grids)
     }
 
-    // Initialize WebSocket connections
+    // Initialize the WebSocket connection
     init() {
-        this.connectLeaderboard();
-        this.connectBoard();
+        this.connect();
+    }
+
+    // Topics this page needs
+    topics() {
+        const topics = ['leaderboard', 'board'];
+        if (document.getElementById('hintsContainer')) {
+            topics.push('treasure');
+        }
+        if (window.location.pathname === '/admin') {
+            topics.push('admin');
+        }
+        return topics;
     }
 
     // Load image with caching to prevent unnecessary refetching
@@ -53,100 +78,105 @@ class LiveWebSocketManager {
         this.updateTimeout = setTimeout(callback, delay);
     }
 
-    // Connect to leaderboard WebSocket
-    connectLeaderboard() {
+    // Connect to the multiplexed WebSocket and subscribe to this page's topics
+    connect() {
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const wsUrl = `${protocol}//${window.location.host}/ws/leaderboard`;
+        let wsUrl = `${protocol}//${window.location.host}/ws?topics=${this.topics().join(',')}`;
+        // Resume from the last board event we saw so the server only sends what we missed
+        if (this.boardSeq !== null) {
+            wsUrl += `&since=${this.boardSeq}&epoch=${this.boardEpoch}`;
+        }
         
         try {
-            this.leaderboardWs = new WebSocket(wsUrl);
+            this.ws = new WebSocket(wsUrl);
             
-            this.leaderboardWs.onopen = () => {
-                console.log('Leaderboard WebSocket connected');
+            this.ws.onopen = () => {
+                console.log('WebSocket connected');
                 this.reconnectAttempts = 0;
             };
             
-            this.leaderboardWs.onmessage = (event) => {
+            this.ws.onmessage = (event) => {
                 try {
-                    const data = JSON.parse(event.data);
-                    if (data.type === 'leaderboard_update') {
-                        this.updateLeaderboard(data.data.leaderboard);
-                    }
+                    this.handleMessage(JSON.parse(event.data));
                 } catch (e) {
-                    console.error('Error parsing leaderboard data:', e);
+                    console.error('Error parsing WebSocket message:', e);
                 }
             };
             
-            this.leaderboardWs.onclose = () => {
-                console.log('Leaderboard WebSocket disconnected');
-                this.reconnectLeaderboard();
+            this.ws.onclose = () => {
+                console.log('WebSocket disconnected');
+                this.reconnect();
             };
             
-            this.leaderboardWs.onerror = (error) => {
-                console.error('Leaderboard WebSocket error:', error);
+            this.ws.onerror = (error) => {
+                console.error('WebSocket error:', error);
             };
         } catch (error) {
-            console.error('Error connecting to leaderboard WebSocket:', error);
+            console.error('Error connecting to WebSocket:', error);
         }
     }
 
-    // Connect to board WebSocket
-    connectBoard() {
-        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const wsUrl = `${protocol}//${window.location.host}/ws/board`;
-        
-        try {
-            this.boardWs = new WebSocket(wsUrl);
-            
-            this.boardWs.onopen = () => {
-                console.log('Board WebSocket connected');
-                this.reconnectAttempts = 0;
-            };
-            
-            this.boardWs.onmessage = (event) => {
-                try {
-                    const data = JSON.parse(event.data);
-                    if (data.type === 'board_update') {
-                        this.updateBoard(data.data);
-                    }
-                } catch (e) {
-                    console.error('Error parsing board data:', e);
-                }
-            };
-            
-            this.boardWs.onclose = () => {
-                console.log('Board WebSocket disconnected');
-                this.reconnectBoard();
-            };
-            
-            this.boardWs.onerror = (error) => {
-                console.error('Board WebSocket error:', error);
-            };
-        } catch (error) {
-            console.error('Error connecting to board WebSocket:', error);
+    // Route a message to its handler by type
+    handleMessage(data) {
+        if (data.type === 'ping') {
+            // Server heartbeat; answering keeps the connection from being reaped
+            this.ws.send(JSON.stringify({ type: 'pong' }));
+        } else if (data.type === 'leaderboard_update') {
+            this.applyLeaderboardSnapshot(data.data);
+        } else if (data.type === 'leaderboard_patch') {
+            this.applyLeaderboardPatch(data.data);
+        } else if (data.type === 'board_event') {
+            this.applyBoardEvents([data.data], true);
+        } else if (data.type === 'board_events') {
+            this.applyBoardEvents(data.data.events, !data.data.replay);
+        } else if (data.type === 'board_update') {
+            this.applyBoardSnapshot(data.data);
+        } else if (data.type === 'auto_draw_status') {
+            this.updateAutoDrawStatus(data.data);
+        } else if (data.type === 'treasure_update') {
+            this.updateTreasure(data.data);
+        } else if (data.type === 'avatar_refresh_progress') {
+            this.updateAvatarRefreshProgress(data.data);
         }
     }
 
-    // Reconnect leaderboard WebSocket
-    reconnectLeaderboard() {
+    // Reconnect the WebSocket with a growing delay
+    reconnect() {
         if (this.reconnectAttempts < this.maxReconnectAttempts) {
             this.reconnectAttempts++;
-            console.log(`Attempting to reconnect leaderboard WebSocket (${this.reconnectAttempts}/${this.maxReconnectAttempts})`);
+            console.log(`Attempting to reconnect WebSocket (${this.reconnectAttempts}/${this.maxReconnectAttempts})`);
             setTimeout(() => {
-                this.connectLeaderboard();
+                this.connect();
             }, this.reconnectDelay * this.reconnectAttempts);
         }
     }
 
-    // Reconnect board WebSocket
-    reconnectBoard() {
-        if (this.reconnectAttempts < this.maxReconnectAttempts) {
-            this.reconnectAttempts++;
-            console.log(`Attempting to reconnect board WebSocket (${this.reconnectAttempts}/${this.maxReconnectAttempts})`);
-            setTimeout(() => {
-                this.connectBoard();
-            }, this.reconnectDelay * this.reconnectAttempts);
+    // Replace the local ranking with a full snapshot from the server
+    applyLeaderboardSnapshot(data) {
+        this.leaderboardRows = data.leaderboard;
+        this.leaderboardVersion = data.version;
+        this.leaderboardEpoch = data.epoch;
+        this.updateLeaderboard(this.leaderboardRows);
+    }
+
+    // Apply a versioned patch of changed rows, or resync if we missed one
+    applyLeaderboardPatch(patch) {
+        if (patch.version <= this.leaderboardVersion) {
+            return; // Already covered by a newer snapshot
+        }
+        if (patch.epoch !== this.leaderboardEpoch || patch.base_version !== this.leaderboardVersion) {
+            this.loadLeaderboard();
+            return;
         }
+
+        // Rows outside the patch keep their rank; changed rows overwrite their new slot
+        const rows = this.leaderboardRows.slice(0, patch.total);
+        patch.changed.forEach(row => {
+            rows[row.rank - 1] = row;
+        });
+        this.leaderboardRows = rows;
+        this.leaderboardVersion = patch.version;
+        this.updateLeaderboard(this.leaderboardRows);
     }
 
     // Update leaderboard display
@@ -392,6 +422,204 @@ class LiveWebSocketManager {
         }
     }
 
+    // Replace local board state with a full snapshot from the server
+    applyBoardSnapshot(data) {
+        this.boardSeq = data.seq;
+        this.boardEpoch = data.epoch;
+        this.drawnNumbers = data.drawn_numbers || [];
+        this.updateBoard(data);
+        // Claims may have been missed too; refetch them with the tickets
+        this.loadTickets();
+    }
+
+    // Apply sequenced board events, falling back to a resync on any gap
+    // (live events also play the number call)
+    applyBoardEvents(events, live = false) {
+        for (const event of events) {
+            if (event.epoch !== this.boardEpoch || event.seq > this.boardSeq + 1) {
+                // Missed something (or the server restarted) - catch up from the server
+                this.loadBoard();
+                return;
+            }
+            if (event.seq <= this.boardSeq) {
+                continue; // Already applied
+            }
+
+            this.boardSeq = event.seq;
+            if (event.type === 'draw') {
+                this.drawnNumbers.push(event.number);
+                this.appendDrawnNumber(event.number);
+                this.markTicketNumber(event.number);
+                if (live && event.audio_url) {
+                    this.playNumberCall(event.audio_url);
+                }
+                if (event.claims) {
+                    this.announceClaims(event.claims);
+                }
+            } else if (event.type === 'clear') {
+                this.drawnNumbers = [];
+                this.updateBoard({ current_number: null, drawn_numbers: [] });
+                this.renderTickets();
+                this.renderClaims([]);
+            }
+        }
+    }
+
+    // Add a single drawn number without re-rendering the whole history
+    appendDrawnNumber(number) {
+        const currentElement = document.getElementById('current');
+        if (currentElement) {
+            const span = currentElement.querySelector('span');
+            if (span) {
+                span.textContent = number;
+            }
+        }
+
+        const historyElement = document.getElementById('history');
+        if (historyElement) {
+            if (this.drawnNumbers.length === 1) {
+                historyElement.innerHTML = '';
+            }
+            const badge = document.createElement('span');
+            badge.className = 'number-badge';
+            badge.textContent = number;
+            historyElement.appendChild(badge);
+        }
+    }
+
+    // Play a pre-rendered number call on the board page
+    playNumberCall(url) {
+        if (!document.getElementById('current')) return;
+
+        const audio = new Audio(url);
+        audio.play().catch(() => {
+            // Autoplay is blocked until the user interacts with the page
+        });
+    }
+
+    // Load this player's tickets and the claims so far (board page only)
+    async loadTickets() {
+        if (!document.getElementById('myTickets')) return;
+
+        try {
+            const response = await fetch('/api/housie/my-tickets');
+            if (!response.ok) return;
+            const data = await response.json();
+            this.tickets = data.tickets;
+            this.renderTickets();
+            this.renderClaims(data.claims);
+        } catch (error) {
+            console.error('Error loading tickets:', error);
+        }
+    }
+
+    // Draw the tickets, marking numbers already called
+    renderTickets() {
+        const container = document.getElementById('myTickets');
+        if (!container) return;
+
+        if (this.tickets.length === 0) {
+            container.innerHTML = '<div class="alert alert-info">No ticket dealt yet</div>';
+            return;
+        }
+
+        const drawn = new Set(this.drawnNumbers);
+        container.innerHTML = this.tickets.map(ticket => `
+            <table class="housie-ticket">
+                ${ticket.grid.map(row => `
+                    <tr>
+                        ${row.map(number => number === null ?
+                            '<td class="blank"></td>' :
+                            `<td data-number="${number}" class="${drawn.has(number) ? 'marked' : ''}">${number}</td>`
+                        ).join('')}
+                    </tr>
+                `).join('')}
+            </table>
+        `).join('');
+    }
+
+    // Mark a called number on the tickets without re-rendering them
+    markTicketNumber(number) {
+        document.querySelectorAll(`#myTickets td[data-number="${number}"]`).forEach(cell => {
+            cell.classList.add('marked');
+        });
+    }
+
+    claimMessage(claim) {
+        return `🎉 ${claim.real_name} won ${PATTERN_LABELS[claim.pattern] || claim.pattern} on ${claim.number}!`;
+    }
+
+    // Show every claim of the current game
+    renderClaims(claims) {
+        const container = document.getElementById('housieClaims');
+        if (!container) return;
+
+        container.innerHTML = claims.map(claim =>
+            `<div class="alert alert-success">${this.claimMessage(claim)}</div>`
+        ).join('');
+    }
+
+    // Announce claims completed by the number just drawn
+    announceClaims(claims) {
+        const container = document.getElementById('housieClaims');
+        if (!container) return;
+
+        claims.forEach(claim => {
+            const item = document.createElement('div');
+            item.className = 'alert alert-success';
+            item.textContent = this.claimMessage(claim);
+            container.appendChild(item);
+        });
+    }
+
+    // Show the automatic draw schedule on the admin page
+    updateAutoDrawStatus(state) {
+        const statusElement = document.getElementById('autoDrawStatus');
+        if (!statusElement) return;
+
+        if (state.status === 'running') {
+            const seconds = Math.max(0, Math.round(state.next_draw_at - Date.now() / 1000));
+            statusElement.innerHTML = 
+                `<div class="alert alert-success">Auto draw running every ${state.interval}s - next draw in ${seconds}s (${state.remaining} numbers left)</div>`;
+        } else if (state.status === 'paused') {
+            statusElement.innerHTML = 
+                `<div class="alert alert-warning">Auto draw paused (${state.remaining} numbers left)</div>`;
+        } else if (state.status === 'finished') {
+            statusElement.innerHTML = 
+                '<div class="alert alert-info">Auto draw finished - every number has been drawn</div>';
+        } else {
+            statusElement.innerHTML = 
+                '<div class="alert alert-info">Auto draw is off</div>';
+        }
+    }
+
+    // Show avatar refresh job progress on the admin page
+    updateAvatarRefreshProgress(job) {
+        const resultElement = document.getElementById('userManagementResult');
+        if (!resultElement) return;
+
+        if (job.status === 'running') {
+            resultElement.innerHTML = 
+                `<div class="alert alert-info">Refreshing avatars... ${job.processed}/${job.total} (${job.updated} updated, ${job.failed} failed)</div>`;
+        } else if (job.status === 'completed') {
+            resultElement.innerHTML = 
+                `<div class="alert alert-success">Avatar refresh complete: ${job.updated} updated, ${job.failed} failed</div>`;
+            if (typeof loadUsers === 'function') {
+                loadUsers();
+            }
+        } else {
+            resultElement.innerHTML = 
+                '<div class="alert alert-danger">Avatar refresh failed</div>';
+        }
+    }
+
+    // Show the clue pushed after a solve (only the treasure hunt page renders it)
+    updateTreasure(data) {
+        if (typeof renderCurrentQuestion === 'function') {
+            renderCurrentQuestion(data);
+        }
+    }
+
     // Update board display
     updateBoard(data) {
         // Update current number
@@ -416,20 +644,29 @@ class LiveWebSocketManager {
         }
     }
 
-    // Load leaderboard data
+    // Load leaderboard data (only the missed patches when we already have a version)
     async loadLeaderboard() {
         try {
-            // Try to load from localStorage first
-            const cachedData = this.loadLeaderboardFromStorage();
-            if (cachedData) {
-                console.log('Loading leaderboard from cache');
-                this.updateLeaderboard(cachedData);
+            let url = '/api/leaderboard';
+            if (this.leaderboardVersion === null) {
+                // Try to load from localStorage first
+                const cachedData = this.loadLeaderboardFromStorage();
+                if (cachedData) {
+                    console.log('Loading leaderboard from cache');
+                    this.updateLeaderboard(cachedData);
+                }
+            } else {
+                url += `?since=${this.leaderboardVersion}&epoch=${this.leaderboardEpoch}`;
             }
 
             // Always fetch fresh data from server
-            const response = await fetch('/api/leaderboard');
+            const response = await fetch(url);
             const data = await response.json();
-            this.updateLeaderboard(data.leaderboard);
+            if (data.patches) {
+                data.patches.forEach(patch => this.applyLeaderboardPatch(patch));
+            } else {
+                this.applyLeaderboardSnapshot(data);
+            }
         } catch (error) {
             console.error('Error loading leaderboard:', error);
             // Fallback to cached data if available
@@ -441,24 +678,29 @@ class LiveWebSocketManager {
         }
     }
 
-    // Load board data
+    // Load board data (only the missed events when we already have a sequence number)
     async loadBoard() {
         try {
-            const response = await fetch('/api/board');
+            let url = '/api/board';
+            if (this.boardSeq !== null) {
+                url += `?since=${this.boardSeq}&epoch=${this.boardEpoch}`;
+            }
+            const response = await fetch(url);
             const data = await response.json();
-            this.updateBoard(data);
+            if (data.events) {
+                this.applyBoardEvents(data.events);
+            } else {
+                this.applyBoardSnapshot(data);
+            }
         } catch (error) {
             console.error('Error loading board:', error);
         }
     }
 
-    // Close all connections
+    // Close the connection
     close() {
-        if (this.leaderboardWs) {
-            this.leaderboardWs.close();
-        }
-        if (this.boardWs) {
-            this.boardWs.close();
+        if (this.ws) {
+            this.ws.close();
         }
     }
 }
@@ -476,10 +718,12 @@ document.addEventListener('DOMContentLoaded', function() {
         // Load initial data
         window.liveManager.loadLeaderboard();
         window.liveManager.loadBoard();
+        window.liveManager.loadTickets();
         
         // Auto-load users list if on admin page
         if (window.location.pathname === '/admin' && typeof loadUsers === 'function') {
             loadUsers();
+            loadAutoDrawStatus();
         }
         
         // Set up periodic refresh as backup (less frequent)
@@ -510,11 +754,35 @@ function showBoard() {
 }
 
 // Admin functions
-async function loadUsers() {
+// Users shown in the admin table so far, and the cursor for the next page
+let loadedUsers = [];
+let usersCursor = null;
+let usersSearchTimeout = null;
+
+// Load the first page of users (or append the next one)
+async function loadUsers(more = false) {
     try {
-        const response = await fetch('/api/users');
+        const params = new URLSearchParams();
+        const search = document.getElementById('usersSearch');
+        if (search && search.value.trim()) {
+            params.set('q', search.value.trim());
+        }
+        if (more && usersCursor) {
+            params.set('cursor', usersCursor);
+        }
+        const response = await fetch(`/api/users?${params}`);
         const data = await response.json();
-        updateUsersTable(data.users);
+        if (!response.ok) {
+            throw new Error(data.detail);
+        }
+        loadedUsers = more ? loadedUsers.concat(data.users) : data.users;
+        usersCursor = data.next_cursor;
+        updateUsersTable(loadedUsers);
+
+        const loadMore = document.getElementById('usersLoadMore');
+        if (loadMore) {
+            loadMore.style.display = usersCursor ? 'inline-block' : 'none';
+        }
     } catch (error) {
         console.error('Error loading users:', error);
         document.getElementById('userManagementResult').innerHTML = 
@@ -522,6 +790,12 @@ async function loadUsers() {
     }
 }
 
+// Search the admin table as the admin types (debounced)
+function searchUsers() {
+    clearTimeout(usersSearchTimeout);
+    usersSearchTimeout = setTimeout(() => loadUsers(), 300);
+}
+
 function updateUsersTable(users) {
     const table = document.getElementById('usersTable');
     if (!table) return;
@@ -652,12 +926,8 @@ async function refreshAvatars() {
         const data = await response.json();
         
         if (response.ok) {
-            document.getElementById('userManagementResult').innerHTML = 
-                `<div class="alert alert-success">${data.message}</div>`;
-            // Refresh the page to show updated avatars
-            setTimeout(() => {
-                window.location.reload();
-            }, 2000);
+            // Progress updates arrive over the WebSocket as the job runs
+            window.liveManager.updateAvatarRefreshProgress(data.job);
         } else {
             document.getElementById('userManagementResult').innerHTML = 
                 `<div class="alert alert-danger">${data.detail || 'Error refreshing avatars'}</div>`;
@@ -669,6 +939,92 @@ async function refreshAvatars() {
     }
 }
 
+async function dealTickets(regenerate) {
+    if (regenerate && !confirm('Are you sure you want to replace every ticket? Claims in the current game are cleared as well.')) return;
+
+    try {
+        const response = await fetch('/api/housie/tickets', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ regenerate: regenerate })
+        });
+        const data = await response.json();
+        
+        if (response.ok) {
+            document.getElementById('drawResult').innerHTML = 
+                `<div class="alert alert-success">${data.message} (${data.total} in play)</div>`;
+        } else {
+            document.getElementById('drawResult').innerHTML = 
+                `<div class="alert alert-danger">${data.detail || 'Error dealing tickets'}</div>`;
+        }
+    } catch (error) {
+        console.error('Error dealing tickets:', error);
+        document.getElementById('drawResult').innerHTML = 
+            '<div class="alert alert-danger">Error dealing tickets</div>';
+    }
+}
+
+async function startAutoDraw() {
+    const interval = parseFloat(document.getElementById('autoDrawInterval').value);
+
+    try {
+        const response = await fetch('/api/auto-draw/start', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ interval: interval })
+        });
+        const data = await response.json();
+        
+        if (response.ok) {
+            window.liveManager.updateAutoDrawStatus(data);
+        } else {
+            document.getElementById('autoDrawStatus').innerHTML = 
+                `<div class="alert alert-danger">${data.detail || 'Error starting auto draw'}</div>`;
+        }
+    } catch (error) {
+        console.error('Error starting auto draw:', error);
+        document.getElementById('autoDrawStatus').innerHTML = 
+            '<div class="alert alert-danger">Error starting auto draw</div>';
+    }
+}
+
+async function controlAutoDraw(action) {
+    if (action === 'stop' && !confirm('Are you sure you want to stop the automatic draw?')) return;
+
+    try {
+        const response = await fetch(`/api/auto-draw/${action}`, {
+            method: 'POST'
+        });
+        const data = await response.json();
+        
+        if (response.ok) {
+            window.liveManager.updateAutoDrawStatus(data);
+        } else {
+            document.getElementById('autoDrawStatus').innerHTML = 
+                `<div class="alert alert-danger">${data.detail || 'Error updating auto draw'}</div>`;
+        }
+    } catch (error) {
+        console.error('Error updating auto draw:', error);
+        document.getElementById('autoDrawStatus').innerHTML = 
+            '<div class="alert alert-danger">Error updating auto draw</div>';
+    }
+}
+
+async function loadAutoDrawStatus() {
+    try {
+        const response = await fetch('/api/auto-draw');
+        if (response.ok) {
+            window.liveManager.updateAutoDrawStatus(await response.json());
+        }
+    } catch (error) {
+        console.error('Error loading auto draw status:', error);
+    }
+}
+
 async function clearAllNumbers() {
     if (!confirm('Are you sure you want to clear all drawn numbers? This action cannot be undone.')) return;
 
@@ -692,6 +1048,110 @@ async function clearAllNumbers() {
     }
 }
 
+// Points queued for a single bulk award (user_id -> { name, points })
+const pointsBatch = new Map();
+
+function addToPointsBatch() {
+    const select = document.getElementById('user_select');
+    const points = parseInt(document.getElementById('points').value);
+    const userId = parseInt(select.value);
+
+    if (!userId || !points) {
+        document.getElementById('pointsResult').innerHTML = 
+            '<div class="alert alert-danger">Select a player and points first</div>';
+        return;
+    }
+
+    // Adding the same player twice just adds up their points
+    const name = select.options[select.selectedIndex].text;
+    const existing = pointsBatch.get(userId);
+    pointsBatch.set(userId, { name: name, points: (existing ? existing.points : 0) + points });
+
+    document.getElementById('pointsResult').innerHTML = '';
+    document.getElementById('pointsForm').reset();
+    renderPointsBatch();
+}
+
+function removeFromPointsBatch(userId) {
+    pointsBatch.delete(userId);
+    renderPointsBatch();
+}
+
+function clearPointsBatch() {
+    pointsBatch.clear();
+    renderPointsBatch();
+}
+
+function renderPointsBatch() {
+    const container = document.getElementById('pointsBatch');
+    if (!container) return;
+
+    if (pointsBatch.size === 0) {
+        container.innerHTML = '';
+        return;
+    }
+
+    container.innerHTML = `
+        <table class="table">
+            <thead>
+                <tr>
+                    <th>Player</th>
+                    <th>Points</th>
+                    <th>Actions</th>
+                </tr>
+            </thead>
+            <tbody>
+                ${Array.from(pointsBatch.entries()).map(([userId, entry]) => `
+                    <tr>
+                        <td>${entry.name}</td>
+                        <td>${entry.points}</td>
+                        <td><button onclick="removeFromPointsBatch(${userId})" class="btn btn-danger btn-sm">Remove</button></td>
+                    </tr>
+                `).join('')}
+            </tbody>
+        </table>
+        <div class="mt-3">
+            <button onclick="submitPointsBatch()" class="btn btn-primary">Give Points to ${pointsBatch.size} Players</button>
+            <button onclick="clearPointsBatch()" class="btn btn-warning">Clear Batch</button>
+        </div>
+    `;
+}
+
+async function submitPointsBatch() {
+    if (pointsBatch.size === 0) return;
+
+    try {
+        const response = await fetch('/api/update-points/bulk', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                entries: Array.from(pointsBatch.entries()).map(([userId, entry]) => ({
+                    user_id: userId,
+                    points: entry.points
+                }))
+            })
+        });
+        const data = await response.json();
+
+        if (response.ok) {
+            document.getElementById('pointsResult').innerHTML = 
+                `<div class="alert alert-success">${data.message || 'Points updated successfully!'}</div>`;
+            clearPointsBatch();
+            // Auto-refresh users list
+            loadUsers();
+        } else {
+            document.getElementById('pointsResult').innerHTML = 
+                `<div class="alert alert-danger">${data.detail || 'Error updating points'}</div>`;
+        }
+    } catch (error) {
+        console.error('Error updating points:', error);
+        document.getElementById('pointsResult').innerHTML = 
+            '<div class="alert alert-danger">Error updating points</div>';
+    }
+}
+
 // Form handlers
 document.addEventListener('DOMContentLoaded', function() {
     // Points form
@@ -774,9 +1234,23 @@ document.addEventListener('DOMContentLoaded', function() {
     loadUsersForDropdown();
 });
 
+let dropdownSearchTimeout = null;
+
+// Filter the player dropdown by username/real name on the server (debounced)
+function searchUsersForDropdown() {
+    clearTimeout(dropdownSearchTimeout);
+    dropdownSearchTimeout = setTimeout(loadUsersForDropdown, 300);
+}
+
+// Fill the player dropdown with the first page of players matching the search box
 async function loadUsersForDropdown() {
     try {
-        const response = await fetch('/api/users/non-admin');
+        const params = new URLSearchParams({ fields: 'user_id,username,real_name' });
+        const search = document.getElementById('user_search');
+        if (search && search.value.trim()) {
+            params.set('q', search.value.trim());
+        }
+        const response = await fetch(`/api/users/non-admin?${params}`);
         const data = await response.json();
         const select = document.getElementById('user_select');
         if (select) {
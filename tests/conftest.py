@@ -0,0 +1,44 @@
+"""Shared fixtures: every test runs against a throwaway SQLite database"""
+import asyncio
+import os
+import tempfile
+
+import dotenv
+import pytest
+
+# Must be set before the app's settings are imported. The committed .env points
+# at the development MySQL server and would override it, so it isn't loaded.
+DATABASE_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ["DATABASE_URL"] = DATABASE_URL
+dotenv.load_dotenv = lambda *args, **kwargs: False
+
+from main.utils import db
+from main.utils.config import settings
+from main.utils.sessions import user_cache
+
+if settings.DATABASE_URL != DATABASE_URL:
+    # Never run the tests against a real database
+    pytest.exit("The app was configured before the test database could be set", returncode=1)
+
+db.engine.echo = False
+db.async_engine.echo = False
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Empty tables for one test"""
+    # SQLite has no CREATE DATABASE
+    monkeypatch.setattr(db, "create_database", lambda: None)
+    db.Base.metadata.drop_all(bind=db.engine)
+    db.create_tables()
+    # Cached users from an earlier test would shadow the new rows with the same ids
+    user_cache.entries.clear()
+    yield db
+    db.SessionLocal.remove()
+    # Pooled aiosqlite connections belong to the test's event loop
+    asyncio.run(db.async_engine.dispose())
@@ -0,0 +1,73 @@
+from sqlalchemy import inspect, text
+
+from main.utils.board_state import BoardState
+from main.utils.db import AsyncSessionLocal, SessionLocal, HousieNumber, create_tables, engine
+
+
+async def draw(worker: BoardState, number: int):
+    async with AsyncSessionLocal() as session:
+        return await worker.draw(session, number)
+
+
+async def clear(worker: BoardState):
+    async with AsyncSessionLocal() as session:
+        return await worker.clear(session)
+
+
+async def test_remote_draws_are_read_from_the_database(anyio_backend, database):
+    first, second = BoardState(), BoardState()
+    await draw(first, 7)
+    await draw(first, 21)
+
+    events = await second.apply_remote({"type": "draw", "number": 21})
+
+    assert [event["number"] for event in events] == [7, 21]
+    assert second.drawn_numbers == [7, 21]
+
+
+async def test_late_clear_does_not_wipe_newer_draws(anyio_backend, database):
+    first, second = BoardState(), BoardState()
+    await draw(first, 5)
+    await second.apply_remote({"type": "draw", "number": 5})
+    await clear(first)
+    await draw(first, 7)
+
+    # The draw's message overtakes the clear's
+    draw_events = await second.apply_remote({"type": "draw", "number": 7})
+    clear_events = await second.apply_remote({"type": "clear"})
+
+    assert [event["type"] for event in draw_events] == ["clear", "draw"]
+    assert clear_events == []
+    assert second.drawn_numbers == first.drawn_numbers == [7]
+
+
+async def test_replayed_message_changes_nothing(anyio_backend, database):
+    first, second = BoardState(), BoardState()
+    await draw(first, 9)
+    await second.apply_remote({"type": "draw", "number": 9})
+
+    assert await second.apply_remote({"type": "draw", "number": 9}) == []
+    assert await second.apply_remote({"type": "clear"}) == []
+    assert second.drawn_numbers == [9]
+
+
+async def test_number_drawn_on_another_worker_is_refused(anyio_backend, database):
+    first, second = BoardState(), BoardState()
+    await draw(first, 7)
+
+    # The second worker hasn't heard about the draw yet
+    assert await draw(second, 7) is None
+    assert second.drawn_numbers == []
+
+
+def test_existing_table_gets_the_unique_index(database):
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE housie_numbers"))
+        conn.execute(text("CREATE TABLE housie_numbers (id INTEGER PRIMARY KEY, number_drawn INTEGER NOT NULL)"))
+        conn.execute(text("INSERT INTO housie_numbers (number_drawn) VALUES (7), (21), (7)"))
+
+    create_tables()
+
+    indexes = inspect(engine).get_indexes("housie_numbers")
+    assert any(index["unique"] and index["column_names"] == ["number_drawn"] for index in indexes)
+    assert [row.number_drawn for row in SessionLocal().query(HousieNumber).order_by(HousieNumber.id)] == [7, 21]
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from main.utils.broadcast_backend import RedisBackend
+from main.utils.config import settings
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+async def start_workers(count: int):
+    """Backends for `count` workers sharing one fake Redis server, each recording what it receives"""
+    server = fakeredis.FakeServer()
+    workers = []
+    for _ in range(count):
+        backend = RedisBackend("redis://unused", "test:", client=fakeredis.FakeAsyncRedis(server=server))
+        backend.received = []
+        backend.subscribe("board", lambda data, backend=backend: record(backend, data))
+        await backend.start()
+        workers.append(backend)
+    return workers
+
+
+async def record(backend: RedisBackend, data: dict):
+    backend.received.append(data)
+
+
+async def wait_for(condition, timeout: float = 2):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def test_messages_reach_the_other_workers_only(anyio_backend):
+    first, second = await start_workers(2)
+    try:
+        await first.publish("board", {"type": "draw", "number": 7})
+        await second.publish("board", {"type": "clear"})
+
+        await wait_for(lambda: first.received and second.received)
+        await asyncio.sleep(0.05)
+        assert first.received == [{"type": "clear"}]
+        assert second.received == [{"type": "draw", "number": 7}]
+    finally:
+        await first.stop()
+        await second.stop()
+
+
+async def test_reader_resubscribes_after_losing_the_connection(anyio_backend, monkeypatch):
+    monkeypatch.setattr(settings, "REDIS_RECONNECT_DELAY", 0.01)
+    first, second = await start_workers(2)
+    try:
+        lost = second.pubsub
+
+        async def drop_connection(*args, **kwargs):
+            raise ConnectionError("connection reset")
+
+        # The next read fails, as it would if Redis restarted
+        lost.parse_response = drop_connection
+        await wait_for(lambda: second.pubsub not in (None, lost) and second.pubsub.subscribed)
+
+        await first.publish("board", {"type": "draw", "number": 2})
+        await wait_for(lambda: second.received == [{"type": "draw", "number": 2}])
+    finally:
+        await first.stop()
+        await second.stop()
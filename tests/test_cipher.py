@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from main.utils.cipher import (
+    decode, decode_many, encode, encode_many, iter_decode, iter_encode,
+    _legacy_encode, _random_clue
+)
+
+
+def split_randomly(rng: random.Random, text: str) -> list:
+    """Cut text into up to four chunks at random positions"""
+    cuts = sorted(rng.sample(range(len(text) + 1), min(3, len(text) + 1)))
+    return [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+
+
+@pytest.mark.parametrize("text, encrypted", [
+    ("Look up", "11,14,14,10,100,20,15"),
+    ("A,B", "0,,,1"),
+    ("", ""),
+])
+def test_examples(text, encrypted):
+    assert encode(text) == encrypted
+    assert decode(encrypted) == text.upper()
+
+
+def test_decode_tolerates_padding_and_unknown_codes():
+    assert decode(" 7 , 04 ,100, 99") == "HE ?"
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_round_trips_match_legacy(seed):
+    rng = random.Random(seed)
+    clues = [_random_clue(rng, rng.randint(0, 120)) for _ in range(500)]
+    encrypted = encode_many(clues)
+    assert encrypted == [_legacy_encode(clue) for clue in clues]
+    assert decode_many(encrypted) == [clue.upper() for clue in clues]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_streaming_matches_one_shot(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        clue = _random_clue(rng, rng.randint(0, 120))
+        encrypted = encode(clue)
+        assert "".join(iter_encode(split_randomly(rng, clue))) == encrypted, clue
+        assert "".join(iter_decode(split_randomly(rng, encrypted))) == clue.upper(), encrypted
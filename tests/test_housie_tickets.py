@@ -0,0 +1,84 @@
+import random
+from types import SimpleNamespace
+
+from main.utils.board_state import BoardState
+from main.utils.db import AsyncSessionLocal, SessionLocal, HousieClaim
+from main.utils.housie_tickets import TicketEngine, encode_rows, generate_ticket, numbers_in
+
+
+def deal(engine: TicketEngine, ticket_id: int, drawn_mask: int = 0, seed: int = 0):
+    rows = generate_ticket(random.Random(seed))
+    ticket = SimpleNamespace(id=ticket_id, user_id=ticket_id, rows=encode_rows(rows))
+    return engine.add(ticket, f"Player {ticket_id}", drawn_mask), rows
+
+
+def mask_of(numbers) -> int:
+    mask = 0
+    for number in numbers:
+        mask |= 1 << number
+    return mask
+
+
+def test_generated_tickets_are_valid():
+    for seed in range(50):
+        rows = generate_ticket(random.Random(seed))
+        assert [len(numbers_in(mask)) for mask in rows] == [5, 5, 5]
+        assert len(numbers_in(rows[0] | rows[1] | rows[2])) == 15
+
+
+def test_patterns_are_claimed_once_in_order():
+    engine = TicketEngine()
+    _state, rows = deal(engine, 1)
+    top, middle, bottom = (numbers_in(mask) for mask in rows)
+
+    claims = [claim["pattern"] for number in top + middle + bottom for claim in engine.on_draw(number)]
+
+    assert claims == ["early_five", "top_line", "middle_line", "bottom_line", "full_house"]
+
+
+def test_ticket_dealt_mid_game_still_wins_patterns_it_is_past():
+    engine = TicketEngine()
+    rows = generate_ticket(random.Random(0))
+    top, middle, _bottom = (numbers_in(mask) for mask in rows)
+    # Six of its numbers were drawn before the ticket was dealt
+    drawn = top + middle[:1]
+    deal(engine, 1, drawn_mask=mask_of(drawn))
+
+    claims = engine.on_draw(middle[1])
+
+    assert {claim["pattern"] for claim in claims} == {"early_five", "top_line"}
+
+
+def test_preview_matches_the_draw_without_counting_it():
+    engine = TicketEngine()
+    state, rows = deal(engine, 1)
+    numbers = numbers_in(rows[0])
+    for number in numbers[:4]:
+        engine.on_draw(number)
+
+    preview = engine.preview(numbers[4])
+
+    assert state.hits == 4 and engine.claimed == set()
+    assert engine.on_draw(numbers[4]) == preview
+    assert [claim["pattern"] for claim in preview] == ["early_five", "top_line"]
+
+
+async def test_claims_are_saved_in_the_draw_transaction(anyio_backend, database):
+    engine = TicketEngine()
+    _state, rows = deal(engine, 1)
+    board = BoardState()
+    board.on_draw = engine.on_draw
+    board.on_clear = engine.on_clear
+    board.preview_claims = engine.preview
+
+    for number in numbers_in(rows[0]):
+        async with AsyncSessionLocal() as db:
+            event, _announcement = await board.draw(db, number)
+
+    assert [claim["pattern"] for claim in event["claims"]] == ["early_five", "top_line"]
+    assert [claim.pattern for claim in SessionLocal().query(HousieClaim).order_by(HousieClaim.id)] == ["early_five", "top_line"]
+
+    async with AsyncSessionLocal() as db:
+        await board.clear(db)
+    assert SessionLocal().query(HousieClaim).count() == 0
+    assert engine.claims == []
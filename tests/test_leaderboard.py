@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from main.api.routes import router
+from main.utils.db import SessionLocal, OutboxEvent, User
+from main.utils.leaderboard import LeaderboardIndex, leaderboard_index
+
+
+def player(user_id: int, points: int, real_name: str = "Player") -> SimpleNamespace:
+    return SimpleNamespace(user_id=user_id, username=f"user{user_id}", real_name=real_name,
+                           profile_photo=None, points=points, role="user", is_deleted=0)
+
+
+def test_unchanged_upsert_keeps_revision_and_patch():
+    index = LeaderboardIndex(patch_ring_size=8)
+    index.upsert(player(1, 10))
+    index.take_patch()
+    etag = index.etag
+
+    index.upsert(player(1, 10))
+
+    assert index.etag == etag
+    assert index.take_patch() is None
+
+
+def test_changed_upsert_moves_revision():
+    index = LeaderboardIndex(patch_ring_size=8)
+    index.upsert(player(1, 10))
+    index.upsert(player(2, 5))
+    etag = index.etag
+
+    index.upsert(player(2, 20))
+
+    assert index.etag != etag
+    assert [row["username"] for row in index.top()] == ["user2", "user1"]
+
+
+@pytest.fixture
+def client(database):
+    session = SessionLocal()
+    session.add(User(username="asha", real_name="Asha", gender="female", points=3))
+    session.commit()
+    leaderboard_index.load()
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        yield client
+
+
+def login(client: TestClient, real_name: str, gender: str = "female"):
+    response = client.post("/api/login", data={"username": "asha", "real_name": real_name, "gender": gender},
+                           follow_redirects=False)
+    assert response.status_code == 302
+
+
+def outbox_rows() -> int:
+    return SessionLocal().query(OutboxEvent).count()
+
+
+def test_repeat_login_announces_nothing(client):
+    etag = leaderboard_index.etag
+    login(client, "Asha")
+    login(client, "Asha")
+    assert leaderboard_index.etag == etag
+    assert outbox_rows() == 0
+
+
+def test_login_with_new_name_is_announced(client):
+    login(client, "Asha Rao")
+    assert leaderboard_index.entries[1]["real_name"] == "Asha Rao"
+    assert outbox_rows() == 1
@@ -0,0 +1,60 @@
+import json
+import time
+
+# Importing the API registers the channel handlers
+import main.api.game  # noqa: F401
+from main.utils.board_state import board_state
+from main.utils.config import settings
+from main.utils.db import AsyncSessionLocal, SessionLocal, HousieNumber, OutboxEvent
+from main.utils.outbox import outbox
+
+
+def leave_stale_event(channel: str, data: dict):
+    """An event committed by a worker that died before publishing it"""
+    session = SessionLocal()
+    session.add(OutboxEvent(channel=channel, payload=json.dumps(data), owner="dead-worker",
+                            created_at=time.time() - settings.OUTBOX_STALE_AFTER - 1))
+    session.commit()
+
+
+async def recover():
+    await outbox._claim_stale()
+    while await outbox._publish_batch():
+        pass
+
+
+async def test_recovered_clear_does_not_wipe_the_loaded_board(anyio_backend, database):
+    leave_stale_event("board", {"type": "clear"})
+    session = SessionLocal()
+    session.add_all([HousieNumber(number_drawn=number) for number in (7, 21, 42)])
+    session.commit()
+    board_state.load()
+
+    await recover()
+
+    assert board_state.drawn_numbers == [7, 21, 42]
+    async with AsyncSessionLocal() as db:
+        assert await board_state.draw(db, 7) is None
+
+
+async def test_recovered_draw_reaches_this_worker(anyio_backend, database):
+    board_state.load()
+    session = SessionLocal()
+    session.add(HousieNumber(number_drawn=33))
+    session.commit()
+    leave_stale_event("board", {"type": "draw", "number": 33})
+
+    await recover()
+
+    assert board_state.drawn_numbers == [33]
+    assert SessionLocal().query(OutboxEvent).count() == 0
+
+
+async def test_events_of_a_live_worker_are_left_alone(anyio_backend, database):
+    session = SessionLocal()
+    session.add(OutboxEvent(channel="board", payload="{}", owner="live-worker", created_at=time.time()))
+    session.commit()
+
+    await recover()
+
+    assert [event.owner for event in SessionLocal().query(OutboxEvent)] == ["live-worker"]
@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from main.utils.config import settings
+from main.utils.websocket_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """Records sent messages; a stalled socket blocks every send until released"""
+
+    def __init__(self, stalled: bool = False):
+        self.client = SimpleNamespace(host="127.0.0.1")
+        self.sent = []
+        self.released = asyncio.Event()
+        if not stalled:
+            self.released.set()
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, message: str):
+        await self.released.wait()
+        self.sent.append(message)
+
+
+@pytest.fixture
+async def manager(monkeypatch):
+    monkeypatch.setattr(settings, "WS_SEND_QUEUE_SIZE", 2)
+    manager = ConnectionManager()
+    yield manager
+    for websocket in list(manager.clients):
+        manager.disconnect(websocket)
+    await manager.stop()
+
+
+async def connect(manager: ConnectionManager, stalled: bool = False) -> FakeWebSocket:
+    websocket = FakeWebSocket(stalled)
+    assert await manager.connect(websocket, ["board"])
+    return websocket
+
+
+async def settle():
+    """Let the writer tasks run"""
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+async def send_events(manager: ConnectionManager, count: int):
+    for seq in range(count):
+        await manager.broadcast_board_event({"seq": seq})
+        await settle()
+
+
+async def test_stalled_client_does_not_hold_up_the_others(anyio_backend, manager):
+    fast = await connect(manager)
+    stalled = await connect(manager, stalled=True)
+
+    await send_events(manager, 5)
+
+    assert len(fast.sent) == 5
+    assert stalled.sent == []
+
+
+async def test_drop_oldest_keeps_the_newest_messages(anyio_backend, manager, monkeypatch):
+    monkeypatch.setattr(settings, "WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+    stalled = await connect(manager, stalled=True)
+
+    await send_events(manager, 5)
+    stalled.released.set()
+    await settle()
+
+    # The first message was already being sent; the queue kept the last two
+    assert [message[-3] for message in stalled.sent] == ["0", "3", "4"]
+    assert manager.clients[stalled].dropped == 2
+
+
+async def test_coalesce_replaces_superseded_snapshots(anyio_backend, manager, monkeypatch):
+    monkeypatch.setattr(settings, "WS_SLOW_CONSUMER_POLICY", "coalesce")
+    stalled = await connect(manager, stalled=True)
+
+    for status in ("running", "paused", "stopped"):
+        await manager.broadcast_auto_draw({"status": status})
+        await settle()
+    stalled.released.set()
+    await settle()
+
+    # "running" was already being sent; "stopped" replaced "paused" in the queue
+    assert [message.split('"status":"')[1].split('"')[0] for message in stalled.sent] == ["running", "stopped"]
+
+
+async def test_disconnect_policy_drops_the_slow_client(anyio_backend, manager, monkeypatch):
+    monkeypatch.setattr(settings, "WS_SLOW_CONSUMER_POLICY", "disconnect")
+    stalled = await connect(manager, stalled=True)
+
+    await send_events(manager, 5)
+
+    assert stalled not in manager.clients
+    assert manager.topics["board"] == set()
+    assert manager.per_ip == {}
@@ -0,0 +1,59 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from main.api.game import router
+from main.utils.db import SessionLocal, User
+from main.utils.sessions import create_session_token
+from main.utils.websocket_manager import manager
+
+
+@pytest.fixture
+def client(database):
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        yield client
+
+
+def login(client: TestClient, role: str):
+    session = SessionLocal()
+    user = User(username=role, real_name=role.title(), role=role, points=0)
+    session.add(user)
+    session.commit()
+    client.cookies.set("session_token", create_session_token(user))
+
+
+def wait_for_echo(websocket):
+    """Messages are handled in order, so the echo means everything sent before it was too"""
+    websocket.send_text("hello")
+    while websocket.receive_text() != "hello":
+        pass
+
+
+def admin_subscribers(client: TestClient, topics: str) -> int:
+    with client.websocket_connect(f"/ws?topics={topics}") as websocket:
+        wait_for_echo(websocket)
+        return len(manager.topics["admin"])
+
+
+@pytest.mark.parametrize("topics", ["admin", "admin,admin", "board,admin, admin"])
+def test_admin_topic_needs_an_admin_session(client, topics):
+    assert admin_subscribers(client, topics) == 0
+
+
+def test_players_cannot_subscribe_to_admin(client):
+    login(client, "user")
+    assert admin_subscribers(client, "admin,admin") == 0
+
+
+def test_admins_can_subscribe_to_admin(client):
+    login(client, "admin")
+    assert admin_subscribers(client, "admin,admin") == 1
+
+
+def test_subscribe_command_is_checked_too(client):
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_text('{"action": "subscribe", "topics": ["admin", "admin"]}')
+        wait_for_echo(websocket)
+        assert len(manager.topics["admin"]) == 0